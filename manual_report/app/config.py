@@ -0,0 +1,23 @@
+import os
+
+# --- Configuración de directorios y parámetros de la aplicación ---
+OUTPUT_DIR = "output"
+LANDMARKS_DATA_DIR = os.path.join(OUTPUT_DIR, "landmarks_data")
+TRAJECTORY_DATA_DIR = os.path.join(OUTPUT_DIR, "trajectory_data")
+LANDMARK_IMAGES_DIR = os.path.join(OUTPUT_DIR, "landmark_images")
+MARKS_FILE = os.path.join(LANDMARKS_DATA_DIR, "markers.json")  # formato anterior, solo se importa
+LANDMARKS_DB_FILE = os.path.join(LANDMARKS_DATA_DIR, "landmarks.db")
+GEMINI_CACHE_FILE = os.path.join(OUTPUT_DIR, "gemini_cache.json")
+TRAJECTORY_FILE = os.path.join(TRAJECTORY_DATA_DIR, "path.txt")
+UPLOAD_CHUNK_SIZE = 64 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024  # búfer para copiar subidas que no pueden usar sendfile
+MAX_IMAGE_SIDE = 1024       # lado máximo (px) de las imágenes guardadas y enviadas a Gemini
+JPEG_QUALITY = 85
+POSE_BATCH_SIZE = 128       # poses escritas como máximo por lote
+POSE_BATCH_WAIT = 0.1       # segundos que se espera para completar un lote
+POSE_FLUSH_INTERVAL = 1.0   # segundos entre flush() del archivo de trayectoria
+POSE_SYNC_TIMEOUT = 10.0    # segundos que el apagado espera a que se escriban las poses pendientes
+HTTP_MAX_CONNECTIONS = 64   # conexiones simultáneas hacia la API de Gemini
+HTTP_MAX_KEEPALIVE = 32
+HTTP_TIMEOUT = 120.0        # segundos; el análisis de una imagen puede tardar
+REPORT_CHUNK_SIZE = 1024 * 1024  # bytes por bloque al enviar un PDF
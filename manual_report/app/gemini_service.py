@@ -1,81 +1,123 @@
 import google.genai as genai
 from google.genai import types
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+import asyncio
+import hashlib
+import httpx
+import orjson
 import logging
-from typing import Dict, Optional
+import os
+import time
+from typing import Any, Dict, Optional
+from app.schemas import LandmarkAnalysis
 
 logger = logging.getLogger(__name__)
 
+# Prompt for landmark analysis. The output format is enforced server-side through
+# the LandmarkAnalysis response schema, so the prompt only describes the content.
+_CONTEXTUAL_PROMPT = (
+    "You are a highly precise analytical AI for a Mars rover mission. "
+    "An image of a potential landmark is provided. Give a succinct, technical analysis: "
+    "a specific name for the object, one sentence on its key physical features (material, shape, condition), "
+    "and one short sentence each on its probable origin, potential utility and relevance."
+)
+
+_GENERATION_CONFIG = types.GenerateContentConfig(
+    temperature = 0.2,
+    response_mime_type = "application/json",
+    response_schema = LandmarkAnalysis
+)
+
 class GeminiService:
     """
     A dedicated service class to encapsulate all interactions with the Google Gemini API.
+    Analyses are cached by content (SHA-256 of the image plus the prompt/model), so a
+    re-submitted image is answered without a new API round-trip. Cache misses are sent right
+    away, with a semaphore bounding how many Gemini calls are in flight at once; concurrent
+    requests for the same image share a single call.
     """
-    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash"):
-        self.model = genai.Client(api_key = api_key)
+    # Seconds a cached analysis stays valid before it is evicted.
+    EVICT_AFTER = 7 * 24 * 3600
+
+    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash", cache_path: Optional[str] = None,
+                 max_concurrency: int = 8,
+                 http_client: Optional[httpx.AsyncClient] = None):
+        # A shared httpx client keeps connections to the Gemini API alive between requests.
+        # The SDK does not close a client it was given; its owner is responsible for that.
+        http_options = types.HttpOptions(httpx_async_client=http_client) if http_client else None
+        self.model = genai.Client(api_key = api_key, http_options = http_options)
         self.model_name = model_name
-        logger.info(f"GeminiService initialized with model: {model_name}")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._prompt_hash = hashlib.sha256(
+            f"{model_name}\n{_CONTEXTUAL_PROMPT}".encode("utf-8")
+        ).hexdigest()
+        self._cache_path = cache_path
+        self._cache: Dict[str, Dict[str, Any]] = self._load_cache()
+        self._cache_lock = asyncio.Lock()
+        self._flush_tasks = set()
+        self._pending: Dict[str, asyncio.Task] = {}
+        logger.info(f"GeminiService initialized with model: {model_name} ({len(self._cache)} cached analyses)")
 
-    def _build_contextual_analysis_prompt(self) -> str:
-        """
-        Constructs the detailed prompt for landmark analysis, similar to the IdentifierAgent.
+    def _is_expired(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry.get("created", 0) > self.EVICT_AFTER
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
         """
-        return """
-        You are a highly precise analytical AI for a Mars rover mission.
-        An image of a potential landmark is provided.
-        Your task is to provide a SUCCINCT and TECHNICAL analysis.
-        You MUST STRICTLY follow this format, without any markdown or extra text. Be brief.
-
-        OBJECT_NAME: [Specific, technical name for the object. E.g., "Handheld geological drill," "Scientific module control panel," "Heat shield fragment."]
-        DETAILED_DESCRIPTION: [A single, concise sentence describing the object's key physical features. Focus on material, shape, and condition.]
-        CONTEXTUAL_ANALYSIS: [A brief, point-form analysis. Answer each point in a single, short sentence.]
-        - Probable origin:
-        - Potential utility:
-        - Relevance/Importance:
+        Loads the persisted response cache once, dropping expired entries.
         """
+        if not self._cache_path or not os.path.exists(self._cache_path):
+            return {}
+        try:
+            with open(self._cache_path, "rb") as f:
+                cache = orjson.loads(f.read())
+            return {key: entry for key, entry in cache.items() if not self._is_expired(entry)}
+        except Exception as e:
+            logger.warning(f"Could not load the Gemini cache from {self._cache_path}: {e}")
+            return {}
+
+    def _write_cache(self, snapshot: Dict[str, Dict[str, Any]]):
+        tmp_path = f"{self._cache_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(snapshot))
+        os.replace(tmp_path, self._cache_path)
 
-    def _parse_contextual_response(self, response_text: str) -> Dict[str, str]:
+    async def _flush_cache(self):
         """
-        Parses the structured text response from the Gemini model.
+        Persists the cache off the event loop. Writes are serialized by the cache lock.
         """
-        parsed_data = {
-            "object_name": "Unknown",
-            "description": "No description available.",
-            "analysis": "No analysis available."
-        }
-        current_section = None
-        
-        lines = response_text.strip().split('\n')
-        
-        for i, line in enumerate(lines):
-            line_stripped = line.strip()
-            if line_stripped.startswith("OBJECT_NAME:"):
-                parsed_data["object_name"] = line_stripped.split(":", 1)[1].strip()
-                current_section = "description"
-            elif line_stripped.startswith("DETAILED_DESCRIPTION:"):
-                parsed_data["description"] = line_stripped.split(":", 1)[1].strip()
-                current_section = "analysis"
-            elif line_stripped.startswith("CONTEXTUAL_ANALYSIS:"):
-                # Join all subsequent lines for the analysis
-                analysis_text = line_stripped.split(":", 1)[1].strip()
-                if i + 1 < len(lines):
-                    analysis_text += "\n" + "\n".join(l.strip() for l in lines[i+1:])
-                parsed_data["analysis"] = analysis_text.strip()
-                break # Stop after capturing the full analysis
-        
-        return parsed_data
+        if not self._cache_path:
+            return
+        async with self._cache_lock:
+            try:
+                await asyncio.to_thread(self._write_cache, dict(self._cache))
+            except Exception as e:
+                logger.warning(f"Could not persist the Gemini cache to {self._cache_path}: {e}")
+
+    def _schedule_flush(self):
+        task = asyncio.create_task(self._flush_cache())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    def _cache_key(self, image_hash: str) -> str:
+        return f"{image_hash}:{self._prompt_hash}"
 
-    async def get_contextual_analysis(self, image_bytes: bytes) -> Optional[Dict[str, str]]:
+    def get_cached_analysis(self, image_hash: str) -> Optional[Dict[str, str]]:
         """
-        Analyzes an image to identify and contextually describe a landmark.
-        
-        Args:
-            image_bytes: The image data in bytes.
-            
-        Returns:
-            A dictionary containing the parsed analysis or None on failure.
+        Returns the cached analysis for an image SHA-256 hex digest, or None on a miss.
         """
-        prompt = self._build_contextual_analysis_prompt()
+        key = self._cache_key(image_hash)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if self._is_expired(entry):
+            del self._cache[key]
+            return None
+        logger.info("Gemini cache hit, skipping API call.")
+        return dict(entry["result"])
 
+    async def _call_gemini(self, image_bytes: bytes) -> Optional[Dict[str, str]]:
+        """
+        Sends a single image to Gemini and returns the structured analysis, or None on failure.
+        """
         try:
             response = await self.model.aio.models.generate_content(
                 model = self.model_name,
@@ -86,15 +128,59 @@ class GeminiService:
                             mime_type = 'image/jpeg'
                         )
                     ),
-                    types.Part(text = prompt)
+                    types.Part(text = _CONTEXTUAL_PROMPT)
                 ],
-                config = types.GenerateContentConfig(
-                    temperature = 0.2
-                )
+                config = _GENERATION_CONFIG
             )
             logger.info("Received response from Gemini API.")
-            return self._parse_contextual_response(response.text)
+            analysis = response.parsed or LandmarkAnalysis.model_validate_json(response.text)
+            return analysis.model_dump()
             
         except Exception as e:
             logger.error(f"An error occurred while calling the Gemini API: {e}")
             return None
+
+    async def get_contextual_analysis(self, image_bytes: bytes, image_hash: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """
+        Analyzes an image to identify and contextually describe a landmark.
+        
+        Args:
+            image_bytes: The image data in bytes.
+            image_hash: Cache key for the image (SHA-256 hex digest of the original upload).
+                Defaults to the digest of image_bytes.
+            
+        Returns:
+            A dictionary containing the parsed analysis or None on failure.
+        """
+        image_hash = image_hash or hashlib.sha256(image_bytes).hexdigest()
+        cached = self.get_cached_analysis(image_hash)
+        if cached is not None:
+            return cached
+
+        key = self._cache_key(image_hash)
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._analyze(key, image_bytes))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        # shield: a cancelled request must not cancel the call other requests are waiting on
+        result = await asyncio.shield(task)
+        return dict(result) if result is not None else None
+
+    async def _analyze(self, key: str, image_bytes: bytes) -> Optional[Dict[str, str]]:
+        async with self._semaphore:
+            result = await self._call_gemini(image_bytes)
+        if result is not None:
+            self._cache[key] = {"result": result, "created": time.time()}
+            self._schedule_flush()
+        return result
+
+    async def close(self):
+        """
+        Cancels in-flight analyses and waits for pending cache writes.
+        """
+        pending = list(self._pending.values())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
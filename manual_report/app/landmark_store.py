@@ -0,0 +1,101 @@
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+from app.schemas import LANDMARK_LIST_ADAPTER
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = "id, ts, x, y, z, name, description, analysis, img_path"
+
+class LandmarkStore:
+    """
+    SQLite-backed storage for confirmed landmarks.
+    Landmarks are read and written as dictionaries with the same shape as Landmark.model_dump().
+    The connection is shared across threads, so call these methods through asyncio.to_thread
+    from async endpoints; a lock serializes access to it.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS landmarks("
+                "id TEXT NOT NULL, ts REAL, x REAL, y REAL, z REAL, "
+                "name TEXT, description TEXT, analysis TEXT, img_path TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS landmarks_id ON landmarks(id)")
+
+    @staticmethod
+    def _to_row(landmark: Dict[str, Any]) -> tuple:
+        location = landmark["location"]
+        return (
+            landmark["id"], landmark["timestamp"], location["x"], location["y"], location["z"],
+            landmark["name"], landmark.get("detailed_description"), landmark.get("contextual_analysis"),
+            landmark.get("best_image_path"),
+        )
+
+    @staticmethod
+    def _from_row(row: tuple) -> Dict[str, Any]:
+        lm_id, ts, x, y, z, name, description, analysis, img_path = row
+        return {
+            "id": lm_id,
+            "name": name,
+            "location": {"x": x, "y": y, "z": z},
+            "timestamp": ts,
+            "best_image_path": img_path,
+            "detailed_description": description,
+            "contextual_analysis": analysis,
+        }
+
+    def add(self, landmark: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(f"INSERT INTO landmarks({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", self._to_row(landmark))
+
+    def list(self, limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        """Returns landmarks in insertion order. A limit of None returns all of them."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM landmarks ORDER BY rowid LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset),
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def delete_last(self) -> Optional[Dict[str, Any]]:
+        """Deletes the most recently inserted landmark and returns it, or None if the store is empty."""
+        with self._lock, self._conn:
+            row = self._conn.execute(f"SELECT rowid, {_COLUMNS} FROM landmarks ORDER BY rowid DESC LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM landmarks WHERE rowid = ?", (row[0],))
+        return self._from_row(row[1:])
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM landmarks").fetchone()[0]
+
+    def import_json(self, json_path: str) -> int:
+        """
+        Imports landmarks from a legacy markers.json file when the store is empty.
+        The file is validated as a whole, so a malformed entry aborts the import.
+        """
+        if not os.path.exists(json_path) or self.count() > 0:
+            return 0
+        try:
+            with open(json_path, "rb") as f:
+                landmarks = [lm.model_dump() for lm in LANDMARK_LIST_ADAPTER.validate_json(f.read())]
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    f"INSERT INTO landmarks({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [self._to_row(lm) for lm in landmarks],
+                )
+            return len(landmarks)
+        except Exception as e:
+            logger.warning(f"Could not import landmarks from {json_path}: {e}")
+            return 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,23 +1,21 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI
 import os
 import logging
-import json
-import shutil
-import time
-import hashlib
+import asyncio
+import httpx
+import multiprocessing
+import threading
 from contextlib import asynccontextmanager
-from app.schemas import Landmark, LandmarkMetadata, PoseData, Position
-from app.report_generator import ReportGenerator
+from concurrent.futures import ProcessPoolExecutor
+from app.config import (
+    LANDMARKS_DATA_DIR, TRAJECTORY_DATA_DIR, LANDMARK_IMAGES_DIR, MARKS_FILE, LANDMARKS_DB_FILE,
+    GEMINI_CACHE_FILE, TRAJECTORY_FILE, HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_TIMEOUT,
+    POSE_SYNC_TIMEOUT,
+)
 from app.gemini_service import GeminiService
-
-# --- Configuración de directorios y logging ---
-OUTPUT_DIR = "output"
-LANDMARKS_DATA_DIR = os.path.join(OUTPUT_DIR, "landmarks_data")
-TRAJECTORY_DATA_DIR = os.path.join(OUTPUT_DIR, "trajectory_data")
-LANDMARK_IMAGES_DIR = os.path.join(OUTPUT_DIR, "landmark_images")
-MARKS_FILE = os.path.join(LANDMARKS_DATA_DIR, "markers.json")
-TRAJECTORY_FILE = os.path.join(TRAJECTORY_DATA_DIR, "path.txt")
+from app.landmark_store import LandmarkStore
+from app.routers import landmarks, poses, reports
+from app.routers.poses import pose_flusher, sync_trajectory
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,144 +28,55 @@ async def lifespan(app: FastAPI):
     os.makedirs(TRAJECTORY_DATA_DIR, exist_ok=True)
     os.makedirs(LANDMARK_IMAGES_DIR, exist_ok=True)
     
-    if not os.path.exists(MARKS_FILE):
-        with open(MARKS_FILE, "w") as f: json.dump([], f)
-    if not os.path.exists(TRAJECTORY_FILE):
-        with open(TRAJECTORY_FILE, "w") as f: f.write("")
-
+    app.state.landmark_store = LandmarkStore(LANDMARKS_DB_FILE)
+    imported = app.state.landmark_store.import_json(MARKS_FILE)
+    if imported:
+        logger.info(f"{imported} landmarks importados desde {MARKS_FILE}.")
+    app.state.landmarks_json_bytes = None  # cache de la respuesta de /landmarks/
+    app.state.landmarks_version = 0
+    app.state.pose_file = open(TRAJECTORY_FILE, "a", buffering=1 << 16)
+    # pose_flusher escribe el archivo desde hilos: el lock serializa la escritura con el cierre
+    app.state.pose_file_lock = threading.Lock()
+    app.state.pose_queue = asyncio.Queue()
+    pose_task = asyncio.create_task(pose_flusher(app))
+
+    # Pool de procesos para generar los informes sin bloquear el event loop. Con forkserver los
+    # workers no heredan por fork los hilos, el cliente HTTP ni la conexión sqlite de este proceso.
+    app.state.report_pool = ProcessPoolExecutor(
+        max_workers=max(1, (os.cpu_count() or 2) - 1),
+        mp_context=multiprocessing.get_context("forkserver"),
+    )
+
+    # Cliente HTTP compartido (keep-alive) para todas las llamadas a Gemini
+    app.state.http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+        timeout=httpx.Timeout(HTTP_TIMEOUT),
+    )
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         logger.warning("La variable de entorno GOOGLE_API_KEY no está configurada.")
         app.state.gemini_service = None
     else:
-        app.state.gemini_service = GeminiService(api_key=api_key)
+        app.state.gemini_service = GeminiService(api_key=api_key, cache_path=GEMINI_CACHE_FILE, http_client=app.state.http_client)
         logger.info("GeminiService inicializado correctamente.")
     
     yield
     logger.info("Apagando la aplicación...")
-
-app = FastAPI(lifespan=lifespan)
-
-# --- Endpoints ---
-
-@app.post("/add_landmark/", response_model=Landmark, status_code=201)
-async def add_landmark(
-    request: Request,
-    metadata_json: str = Form(..., description="Un string JSON que se valida con el schema LandmarkMetadata."),
-    image: UploadFile = File(...)
-):
-    """Recibe datos de un landmark, los analiza y los almacena."""
-    try:
-        metadata = LandmarkMetadata.model_validate_json(metadata_json)
-        image_bytes = await image.read()
-        
-        gemini_service: GeminiService = request.app.state.gemini_service
-        if not gemini_service:
-            raise HTTPException(status_code=503, detail="El servicio de análisis de imágenes no está disponible.")
-            
-        analysis_result = await gemini_service.get_contextual_analysis(image_bytes)
-
-        if not analysis_result or not analysis_result.get("object_name"):
-            raise HTTPException(status_code=400, detail="No se pudo identificar un nombre de landmark válido.")
-
-        landmark_id = f"LM_{int(time.time())}"
-        image_filename = f"{landmark_id}{os.path.splitext(image.filename)[1] or '.png'}"
-        image_filepath = os.path.join(LANDMARK_IMAGES_DIR, image_filename)
-
-        with open(image_filepath, "wb") as buffer:
-            buffer.write(image_bytes)
-
-        new_landmark = Landmark(
-            id=landmark_id,
-            name=analysis_result["object_name"],
-            location=metadata.position,
-            timestamp=metadata.timestamp,
-            best_image_path=os.path.abspath(image_filepath),
-            detailed_description=analysis_result["description"],
-            contextual_analysis=analysis_result["analysis"]
-        )
-
-        landmarks_list = []
-        if os.path.exists(MARKS_FILE):
-            with open(MARKS_FILE, "r") as f:
-                landmarks_list = json.load(f)
-        
-        landmarks_list.append(new_landmark.model_dump())
-
-        with open(MARKS_FILE, "w") as f:
-            json.dump(landmarks_list, f, indent=2)
-        
-        logger.info(f"Nuevo landmark añadido: {new_landmark.name} (ID: {new_landmark.id})")
-        
-        return new_landmark
-
-    except HTTPException as http_exc:
-        raise http_exc
-    except Exception as e:
-        logger.error(f"Error inesperado en add_landmark: {e}")
-        raise HTTPException(status_code=500, detail="Error interno del servidor.")
-
-
-@app.post("/add_pose/", status_code=201)
-async def add_pose(data: PoseData):
-    pos = data.pose.position
-    try:
-        with open(TRAJECTORY_FILE, "a") as f:
-            f.write(f"{pos.x},{pos.y}\n")
-        return JSONResponse(content={"status": "success", "message": "Pose guardada."})
-    except Exception as e:
-        logger.error(f"Fallo al escribir en el archivo de trayectoria: {e}")
-        raise HTTPException(status_code=500, detail="Fallo al guardar la trayectoria.")
-
-@app.post("/generate_report/", response_model=dict)
-async def generate_and_save_report(
-    pgm_file: UploadFile = File(...),
-    yaml_file: UploadFile = File(...)
-):
-    """
-    Genera un informe en PDF usando los archivos de mapa y los datos guardados.
-    """
-    temp_pgm_path = os.path.join(OUTPUT_DIR, f"temp_{pgm_file.filename}")
-    temp_yaml_path = os.path.join(OUTPUT_DIR, f"temp_{yaml_file.filename}")
-    
     try:
-        # Guardar los archivos de mapa subidos temporalmente
-        with open(temp_pgm_path, "wb") as buffer: shutil.copyfileobj(pgm_file.file, buffer)
-        with open(temp_yaml_path, "wb") as buffer: shutil.copyfileobj(yaml_file.file, buffer)
-
-        landmarks_list = []
-        if os.path.exists(MARKS_FILE):
-            with open(MARKS_FILE, 'r') as f: 
-                landmarks_list = json.load(f)
-
-        if not landmarks_list:
-            raise HTTPException(status_code=404, detail="No hay landmarks para generar un informe.")
+        await asyncio.wait_for(sync_trajectory(app), POSE_SYNC_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"Las poses pendientes no se escribieron en {POSE_SYNC_TIMEOUT} s; se cierra el archivo de trayectoria igualmente.")
+    pose_task.cancel()
+    await asyncio.gather(pose_task, return_exceptions=True)
+    with app.state.pose_file_lock:
+        app.state.pose_file.close()
+    app.state.landmark_store.close()
+    if app.state.gemini_service:
+        await app.state.gemini_service.close()
+    await app.state.http_client.aclose()
+    app.state.report_pool.shutdown(wait=True)
 
-        # Preparar los datos para el ReportGenerator
-        map_files = {
-            'pgm': temp_pgm_path, 
-            'yaml': temp_yaml_path,
-            'trajectory': TRAJECTORY_FILE
-        }
-
-        # La llamada al constructor ahora es correcta
-        report_generator = ReportGenerator(
-            landmarks_data=landmarks_list, 
-            map_files=map_files
-        )
-        pdf_filepath = report_generator.generate_report()
-        
-        if not os.path.exists(pdf_filepath):
-            raise HTTPException(status_code=500, detail="El archivo del informe no fue creado.")
-
-        return {
-            "status": "success",
-            "message": "Informe generado.",
-            "filepath": pdf_filepath
-        }
-    except Exception as e:
-        logger.error(f"Fallo al generar el informe: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # La limpieza de los archivos temporales se maneja ahora dentro del ReportGenerator
-        pass
+app = FastAPI(lifespan=lifespan)
+app.include_router(landmarks.router)
+app.include_router(poses.router)
+app.include_router(reports.router)
@@ -1,14 +1,34 @@
 import os
 import math
+import functools
 import yaml
 import cv2
 import numpy as np
-import json
+import orjson
+
+# libyaml's C loader when PyYAML was built with it
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+@functools.lru_cache(maxsize=32)
+def _load_map_yaml(yaml_path, mtime_ns, size):
+    # mtime/size are part of the key so a rewritten file is parsed again
+    with open(yaml_path, 'r') as f:
+        return yaml.load(f, Loader=_YamlLoader)
+
+@functools.lru_cache(maxsize=16)
+def _marker_offsets(radius, thickness):
+    # (drow, dcol) of every pixel cv2.circle paints for a marker centered at (0, 0)
+    pad = radius + max(thickness, 0) + 1
+    stamp = np.zeros((2 * pad + 1, 2 * pad + 1), np.uint8)
+    cv2.circle(stamp, (pad, pad), radius, 255, thickness)
+    drow, dcol = np.nonzero(stamp)
+    return drow - pad, dcol - pad
 
 class MapAnnotator:
     def __init__(self, yaml_path, pgm_path):
-        with open(yaml_path, 'r') as f:
-            self.meta = yaml.safe_load(f)
+        st = os.stat(yaml_path)
+        # copy: the cached dict is shared and __init__ normalizes 'origin' below
+        self.meta = dict(_load_map_yaml(os.path.abspath(yaml_path), st.st_mtime_ns, st.st_size))
 
         # support yaml image path relative to yaml file
         if not os.path.isabs(pgm_path):
@@ -18,11 +38,9 @@ class MapAnnotator:
         if img is None:
             raise FileNotFoundError(f"map image not found: {pgm_path}")
 
-        # Ensure grayscale to color for annotation
-        if len(img.shape) == 2:
-            self.img_color = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-        else:
-            self.img_color = img.copy()
+        # Ensure grayscale to color for annotation. imread returns a fresh array, so a color
+        # image is annotated in place without copying it; the draw_* methods mutate img_color.
+        self.img_color = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR) if img.ndim == 2 else img
         
         self.img_shape = self.img_color.shape
         
@@ -63,47 +81,102 @@ class MapAnnotator:
         in_bounds = (0 <= col < img_w) and (0 <= row_top < img_h)
         return col, row_top, in_bounds
 
+    def _world_to_pixel_batch(self, wx, wy):
+        """
+        Vectorized world_to_pixel over arrays of world coordinates.
+        Returns (cols, rows_top, in_bounds) as NumPy arrays.
+        """
+        res = float(self.meta['resolution'])
+        ox, oy, oyaw = self.meta.get('origin', [0.0, 0.0, 0.0])
+        yaw = float(oyaw)
+
+        # in-place arithmetic keeps intermediates to a couple of buffers for long trajectories
+        dx = np.array(wx, dtype=np.float64)
+        dy = np.array(wy, dtype=np.float64)
+        dx -= float(ox)
+        dy -= float(oy)
+        if yaw == 0.0:
+            # most maps are not rotated: map frame == world frame shifted to the origin
+            x_map, y_map = dx, dy
+        else:
+            cosy, siny = math.cos(yaw), math.sin(yaw)
+            x_map = dx * cosy
+            x_map += siny * dy
+            dy *= cosy
+            dy -= siny * dx
+            y_map = dy
+
+        x_map /= res
+        y_map /= res
+        cols = np.floor(x_map, out=x_map).astype(np.int32)
+        img_h, img_w = self.img_shape[0], self.img_shape[1]
+        rows = np.floor(y_map, out=y_map).astype(np.int32)
+        np.subtract(img_h - 1, rows, out=rows)
+
+        in_bounds = (cols >= 0) & (cols < img_w) & (rows >= 0) & (rows < img_h)
+        return cols, rows, in_bounds
+
     def draw_trajectory(self, trajectory_path, color=(0, 255, 0), thickness=1):
         """Dibuja la trayectoria desde un archivo de texto."""
         try:
-            with open(trajectory_path, 'r') as f:
-                points = []
-                for line in f:
-                    x_str, y_str = line.strip().split(',')
-                    wx, wy = float(x_str), float(y_str)
-                    col, row, in_bounds = self.world_to_pixel(wx, wy)
-                    if in_bounds:
-                        points.append((col, row))
-                
-                if len(points) > 1:
-                    pts = np.array(points, np.int32)
-                    pts = pts.reshape((-1, 1, 2))
-                    cv2.polylines(self.img_color, [pts], isClosed=False, color=color, thickness=thickness)
+            if os.path.getsize(trajectory_path) == 0:
+                return
+            pts = np.loadtxt(trajectory_path, delimiter=',', ndmin=2)
+            cols, rows, in_bounds = self._world_to_pixel_batch(pts[:, 0], pts[:, 1])
+            n = int(np.count_nonzero(in_bounds))
+            if n > 1:
+                # int32 (N, 1, 2) array in the layout cv2.polylines expects, filled without copies of the full set
+                pts = np.empty((n, 1, 2), np.int32)
+                pts[:, 0, 0] = cols[in_bounds]
+                pts[:, 0, 1] = rows[in_bounds]
+                cv2.polylines(self.img_color, [pts], isClosed=False, color=color, thickness=thickness)
         except Exception as e:
             print(f"Error al dibujar la trayectoria: {e}")
 
-    def draw_markers(self, markers_path, color=(0, 0, 255), radius=5, thickness=-1, draw_labels=True):
-        """Dibuja los marcadores desde un archivo JSON."""
+    def draw_markers(self, markers, color=(0, 0, 255), radius=5, thickness=-1, draw_labels=True):
+        """Dibuja los marcadores desde una lista de dicts {name, x, y} o desde un archivo JSON con esa lista."""
         try:
-            with open(markers_path, 'r') as f:
-                markers = json.load(f)
-            
-            for marker in markers:
-                name = marker.get("name", "?")
-                wx, wy = float(marker["x"]), float(marker["y"])
-                col, row, in_bounds = self.world_to_pixel(wx, wy)
-
-                if in_bounds:
-                    cv2.circle(self.img_color, (col, row), radius, color, thickness)
-                    if draw_labels:
-                        label = f"{name}"
-                        text_pos = (max(0, col + 8), max(12, row - 8))
-                        cv2.putText(self.img_color, label, text_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1, cv2.LINE_AA)
-                else:
-                    print(f"Advertencia: El punto {name} ({wx},{wy}) está fuera de los límites del mapa.")
+            if isinstance(markers, (str, os.PathLike)):
+                with open(markers, 'rb') as f:
+                    markers = orjson.loads(f.read())
+            if not markers:
+                return
+            xy = np.array([(marker["x"], marker["y"]) for marker in markers], dtype=np.float64)
+            names = [marker.get("name", "?") for marker in markers]
+            self.draw_markers_array(xy, names, color=color, radius=radius, thickness=thickness, draw_labels=draw_labels)
         except Exception as e:
             print(f"Error al dibujar los marcadores: {e}")
 
+    def draw_markers_array(self, xy, names, color=(0, 0, 255), radius=5, thickness=-1, draw_labels=True):
+        """Dibuja los marcadores a partir de un array (N, 2) de coordenadas del mundo y sus nombres."""
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        cols, rows, in_bounds_all = self._world_to_pixel_batch(xy[:, 0], xy[:, 1])
+
+        # stamp every in-bounds marker with a single indexed assignment instead of one cv2.circle per marker
+        drow, dcol = _marker_offsets(radius, thickness)
+        rr = (rows[in_bounds_all, None] + drow).ravel()
+        cc = (cols[in_bounds_all, None] + dcol).ravel()
+        img_h, img_w = self.img_shape[0], self.img_shape[1]
+        visible = (rr >= 0) & (rr < img_h) & (cc >= 0) & (cc < img_w)
+        # cv2.circle pads a short color with zeros (alpha 0 on a BGRA map); match it so the
+        # indexed assignment broadcasts against any channel count
+        channels = self.img_color.shape[2]
+        fill = tuple(color)[:channels] + (0,) * (channels - len(color))
+        self.img_color[rr[visible], cc[visible]] = fill
+
+        if draw_labels:
+            valid = np.flatnonzero(in_bounds_all)
+            for i, col, row in zip(valid.tolist(), cols[valid].tolist(), rows[valid].tolist()):
+                text_pos = (max(0, col + 8), max(12, row - 8))
+                cv2.putText(self.img_color, f"{names[i]}", text_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1, cv2.LINE_AA)
+
+        outside = np.flatnonzero(~in_bounds_all)
+        if outside.size:
+            print("\n".join(
+                f"Advertencia: El punto {names[i]} ({wx},{wy}) está fuera de los límites del mapa."
+                for i, (wx, wy) in zip(outside.tolist(), xy[outside].tolist())
+            ))
+
     def save_annotated_map(self, out_path):
         """Guarda el mapa anotado."""
         cv2.imwrite(out_path, self.img_color)
@@ -1,21 +1,59 @@
 import time
 import os
+import functools
+import re
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
 from typing import List, Dict, Any
-import markdown2
 from weasyprint import HTML, CSS
-import base64
-import mimetypes
-import json
+from weasyprint.text.fonts import FontConfiguration
+import pathlib
+import numpy as np
 from app.map_marker import MapAnnotator
 
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+# Relative URLs (the logo) resolve against ASSETS_DIR.
+_CSS_TEMPLATE = """
+    @page { size: letter; margin: 1in; @top-left { content: 'ERC 2025 Mission Report'; font-size: 9pt; color: #888; } @top-right { content: url('logo.png'); transform: scale(0.4); position: absolute; top: -20px; right: 0; } @bottom-center { content: "Page " counter(page) " of " counter(pages); font-size: 9pt; color: #888; } }
+    body { font-family: 'Helvetica', sans-serif; font-size: 10pt; line-height: 1.3; } 
+    h1 { text-align: center; border-bottom: 2px solid #333; padding-bottom: 10px; margin-bottom: 25px; } 
+    h2 { page-break-before: always; border-bottom: 1px solid #ccc; padding-top: 15px; font-size: 14pt; } 
+    h3 { font-size: 11pt; font-weight: bold; margin-bottom: -5px; }
+    img { display: block; margin: 10px auto; max-width: 60%; border: 1px solid #ddd; padding: 4px; } 
+    .map-image { max-width: 100%; page-break-inside: avoid; }
+    blockquote { margin-left: 15px; padding-left: 15px; border-left: 3px solid #eee; font-style: italic; color: #333; }
+"""
+
+@functools.lru_cache(maxsize=1)
+def _report_stylesheet():
+    """Parses the report CSS once per process and shares its font configuration."""
+    font_config = FontConfiguration()
+    return CSS(string=_CSS_TEMPLATE, base_url=ASSETS_DIR + os.sep, font_config=font_config), font_config
+
+def _format_timestamps(timestamps: np.ndarray) -> List[str]:
+    """Formats epoch seconds as 'YYYY-MM-DD HH:MM:SS UTC' in one vectorized pass."""
+    if timestamps.size == 0:
+        return []
+    iso = np.datetime_as_string(timestamps.astype(np.int64).astype('datetime64[s]'), unit='s')
+    return np.char.add(np.char.replace(iso, 'T', ' '), ' UTC').tolist()
+
+def _blockquote(text: str) -> str:
+    paragraphs = (escape(p.strip()) for p in re.split(r"\n\s*\n", text) if p.strip())
+    return "<blockquote>" + "".join(f"<p>{p}</p>" for p in paragraphs) + "</blockquote>"
+
 class ReportGenerator:
     def __init__(self, landmarks_data: List[Dict[str, Any]], map_files: Dict[str, str]):
         self.REPORTS_DIR = "output"
-        self.ASSETS_DIR = "assets"
-        self.LOGO_PATH = os.path.join(self.ASSETS_DIR, "logo.png")
         
         self.landmarks = landmarks_data
         self.map_files = map_files
+        # (N, 3) landmark coordinates, built once and shared by the map and the HTML;
+        # missing coordinates are NaN so the map skips them as out of bounds.
+        self.lm_xyz = np.array(
+            [(loc.get('x'), loc.get('y'), loc.get('z')) for loc in ((lm.get('location') or {}) for lm in landmarks_data)],
+            dtype=np.float64,
+        ).reshape(-1, 3)
         self.mission_id = f"MISSION_{time.strftime('%Y%m%d_%H%M%S')}"
         
         os.makedirs(self.REPORTS_DIR, exist_ok=True)
@@ -24,22 +62,14 @@ class ReportGenerator:
         self.pdf_filepath = os.path.join(self.REPORTS_DIR, f"Report_{self.mission_id}.pdf")
 
     def _generate_annotated_map(self):
-        temp_markers_path = None
         try:
-            simple_landmarks = [
-                {"name": lm.get('id', 'N/A'), "x": lm.get('location', {}).get('x'), "y": lm.get('location', {}).get('y')}
-                for lm in self.landmarks
-            ]
-            temp_markers_path = os.path.join(self.REPORTS_DIR, f"temp_markers_{self.mission_id}.json")
-            with open(temp_markers_path, 'w') as f:
-                json.dump(simple_landmarks, f)
-
+            names = [lm.get('id', 'N/A') for lm in self.landmarks]
             annotator = MapAnnotator(
                 yaml_path=self.map_files['yaml'],
                 pgm_path=os.path.basename(self.map_files['pgm']) 
             )
             annotator.draw_trajectory(self.map_files['trajectory'])
-            annotator.draw_markers(temp_markers_path)
+            annotator.draw_markers_array(self.lm_xyz[:, :2], names)
             annotator.save_annotated_map(self.map_filepath)
             
             if not os.path.exists(self.map_filepath):
@@ -50,70 +80,73 @@ class ReportGenerator:
         except Exception as e:
             print(f"Error generating annotated map: {e}")
             self.map_filepath = None
-        finally:
-            if temp_markers_path and os.path.exists(temp_markers_path):
-                os.remove(temp_markers_path)
 
-    def _image_to_base64_uri(self, filepath: str) -> str:
-        try:
-            abs_path = os.path.abspath(filepath)
-            mime_type, _ = mimetypes.guess_type(abs_path)
-            if not mime_type: mime_type = "application/octet-stream"
-            with open(abs_path, "rb") as image_file:
-                encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            return f"data:{mime_type};base64,{encoded_string}"
-        except Exception as e:
-            print(f"Could not convert image to Base64: {e}")
-            return ""
+    def _file_uri(self, filepath: str) -> str:
+        """Returns a file:// URL so WeasyPrint loads the image straight from disk."""
+        return pathlib.Path(filepath).absolute().as_uri()
 
-    def _generate_markdown_report(self) -> str:
-        report_lines = [f"# ERC 2025 Mission Report: {self.mission_id}", f"Generated on: {time.strftime('%Y-%m-%d %H:%M:%S UTC')}"]
-        
-        report_lines.append(f"\n## Mission Summary")
-        report_lines.append(f"- **Total Confirmed Landmarks:** {len(self.landmarks)}")
-        
-        if self.map_filepath and os.path.exists(self.map_filepath):
-            map_uri = self._image_to_base64_uri(self.map_filepath)
-            report_lines.append(f'\n### Operations Map\n<img src="{map_uri}" alt="Mission Overview Map" class="map-image">')
+    def _render_landmark(self, lm: Dict[str, Any], xyz: List[float], observed: str) -> str:
+        # Bind every field to a local once; this runs once per landmark in the report.
+        get = lm.get
+        x, y, z = xyz
+        lm_id = escape(str(get('id', 'N/A')))
+        name = escape(str(get('name', 'N/A')))
+        description = _blockquote(get('detailed_description') or 'Not provided.')
+        analysis = _blockquote(get('contextual_analysis') or 'Not provided.')
+        image_path = get('best_image_path')
+        if image_path and os.path.exists(image_path):
+            image_html = f'<p><img src="{escape(self._file_uri(image_path))}" alt="Photo of {name}" /></p>'
         else:
-            report_lines.append(f'\n### Operations Map\n*Map could not be generated.*')
+            image_html = "<p><em>Image not available.</em></p>"
+        return (
+            f"<h2>Landmark: {lm_id}</h2>\n{image_html}\n"
+            f"<h3>Name/Category</h3>\n<p><strong>{name}</strong></p>\n"
+            f"<h3>Observation Timestamp</h3>\n<p>{observed}</p>\n"
+            f"<h3>Estimated Location</h3>\n<p><code>X={x:.2f}m, Y={y:.2f}m, Z={z:.2f}m</code></p>\n"
+            f"<h3>Detailed Visual Description</h3>\n{description}\n"
+            f"<h3>Martian Contextual Analysis</h3>\n{analysis}"
+        )
 
-        for lm in self.landmarks:
-            lm_id = lm.get('id', 'N/A')
-            report_lines.append(f"\n## Landmark: {lm_id}")
-            image_path = lm.get('best_image_path')
-            if image_path and os.path.exists(image_path):
-                report_lines.append(f"\n![Photo of {lm.get('name', 'N/A')}]({self._image_to_base64_uri(image_path)})\n")
-            else:
-                report_lines.append(f"\n*Image not available.*\n")
-            report_lines.extend([
-                f"### Name/Category\n**{lm.get('name', 'N/A')}**",
-                f"### Observation Timestamp\n{time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime(lm.get('timestamp', 0)))}",
-                f"### Estimated Location\n`X={lm.get('location', {}).get('x', 0):.2f}m, Y={lm.get('location', {}).get('y', 0):.2f}m, Z={lm.get('location', {}).get('z', 0):.2f}m`",
-                f"### Detailed Visual Description\n> {lm.get('detailed_description', 'Not provided.').replace(chr(10), chr(10) + '> ')}",
-                f"### Martian Contextual Analysis\n> {lm.get('contextual_analysis', 'Not provided.').replace(chr(10), chr(10) + '> ')}"
-            ])
-        return "\n".join(report_lines)
+    def _render_landmarks(self) -> str:
+        timestamps = np.fromiter((lm.get('timestamp', 0) for lm in self.landmarks), dtype=np.float64, count=len(self.landmarks))
+        return "\n".join(
+            self._render_landmark(lm, xyz, observed)
+            for lm, xyz, observed in zip(self.landmarks, np.nan_to_num(self.lm_xyz).tolist(), _format_timestamps(timestamps))
+        )
 
-    def _convert_md_to_pdf(self, md_content: str):
-        logo_uri = self._image_to_base64_uri(self.LOGO_PATH) if os.path.exists(self.LOGO_PATH) else ""
-        css_style = f"""
-            @page {{ size: letter; margin: 1in; @top-left {{ content: 'ERC 2025 Mission Report'; font-size: 9pt; color: #888; }} @top-right {{ content: url('{logo_uri}'); transform: scale(0.4); position: absolute; top: -20px; right: 0; }} @bottom-center {{ content: "Page " counter(page) " of " counter(pages); font-size: 9pt; color: #888; }} }}
-            body {{ font-family: 'Helvetica', sans-serif; font-size: 10pt; line-height: 1.3; }} 
-            h1 {{ text-align: center; border-bottom: 2px solid #333; padding-bottom: 10px; margin-bottom: 25px; }} 
-            h2 {{ page-break-before: always; border-bottom: 1px solid #ccc; padding-top: 15px; font-size: 14pt; }} 
-            h3 {{ font-size: 11pt; font-weight: bold; margin-bottom: -5px; }}
-            img {{ display: block; margin: 10px auto; max-width: 60%; border: 1px solid #ddd; padding: 4px; }} 
-            .map-image {{ max-width: 100%; page-break-inside: avoid; }}
-            blockquote {{ margin-left: 15px; padding-left: 15px; border-left: 3px solid #eee; font-style: italic; color: #333; }}
-        """
-        html_body = markdown2.markdown(md_content, extras=['fenced-code-blocks', 'markdown-in-html'])
+    def _generate_html_report(self, landmarks_html: str) -> str:
+        if self.map_filepath and os.path.exists(self.map_filepath):
+            map_html = f'<img src="{escape(self._file_uri(self.map_filepath))}" alt="Mission Overview Map" class="map-image">'
+        else:
+            map_html = '<p><em>Map could not be generated.</em></p>'
+        header = (
+            f"<h1>ERC 2025 Mission Report: {self.mission_id}</h1>\n"
+            f"<p>Generated on: {time.strftime('%Y-%m-%d %H:%M:%S UTC')}</p>\n"
+            f"<h2>Mission Summary</h2>\n"
+            f"<ul><li><strong>Total Confirmed Landmarks:</strong> {len(self.landmarks)}</li></ul>\n"
+            f"<h3>Operations Map</h3>\n{map_html}"
+        )
+        return f"{header}\n{landmarks_html}" if landmarks_html else header
+
+    def _convert_html_to_pdf(self, html_body: str):
         full_html = f"<!DOCTYPE html><html><head><meta charset='UTF-8'></head><body>{html_body}</body></html>"
-        HTML(string=full_html).write_pdf(self.pdf_filepath, stylesheets=[CSS(string=css_style)])
+        stylesheet, font_config = _report_stylesheet()
+        HTML(string=full_html, base_url=os.getcwd()).write_pdf(self.pdf_filepath, stylesheets=[stylesheet], font_config=font_config)
         print(f"✅ PDF report generated successfully: {self.pdf_filepath}")
 
     def generate_report(self) -> str:
-        self._generate_annotated_map()
-        md_content = self._generate_markdown_report()
-        self._convert_md_to_pdf(md_content)
+        # The landmark sections do not depend on the map, so they are built while it renders;
+        # OpenCV releases the GIL while drawing and encoding the PNG.
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            map_done = pool.submit(self._generate_annotated_map)
+            landmarks_html = self._render_landmarks()
+            map_done.result()
+        self._convert_html_to_pdf(self._generate_html_report(landmarks_html))
         return self.pdf_filepath
+
+def build_report(landmarks_data: List[Dict[str, Any]], map_files: Dict[str, str]) -> str:
+    """
+    Genera el informe completo y devuelve la ruta del PDF.
+    Función de nivel de módulo para poder ejecutarla en un ProcessPoolExecutor.
+    """
+    return ReportGenerator(landmarks_data=landmarks_data, map_files=map_files).generate_report()
@@ -0,0 +1,169 @@
+from fastapi import APIRouter, FastAPI, UploadFile, File, HTTPException, Form, Request, Query, Response
+from pydantic import ValidationError
+import os
+import logging
+import time
+import itertools
+import hashlib
+import asyncio
+import io
+import aiofiles
+import orjson
+from PIL import Image, ImageOps, UnidentifiedImageError
+from typing import List, Optional
+from app.config import LANDMARK_IMAGES_DIR, UPLOAD_CHUNK_SIZE, MAX_IMAGE_SIDE, JPEG_QUALITY
+from app.schemas import Landmark, LandmarkMetadata
+from app.gemini_service import GeminiService
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# IDs de landmarks: época de arranque + PID + contador monotónico (únicos y ordenados)
+_ID_EPOCH = int(time.time())
+_ID_COUNTER = itertools.count()
+
+def next_landmark_id() -> str:
+    return f"LM_{_ID_EPOCH}_{os.getpid():x}_{next(_ID_COUNTER):06x}"
+
+async def hash_upload(upload: UploadFile) -> str:
+    """Calcula el hash SHA-256 del archivo subido por bloques y lo deja listo para releerse."""
+    hasher = hashlib.sha256()
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        hasher.update(chunk)
+    await upload.seek(0)
+    return hasher.hexdigest()
+
+def compress_image(fileobj) -> bytes:
+    """Reduce la imagen a MAX_IMAGE_SIDE px como máximo y la recodifica como JPEG."""
+    with Image.open(fileobj) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.LANCZOS)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return out.getvalue()
+
+async def write_image(filepath: str, image_bytes: bytes):
+    async with aiofiles.open(filepath, "wb") as buffer:
+        await buffer.write(image_bytes)
+
+def invalidate_landmarks_json(app: FastAPI):
+    """Descarta el JSON cacheado de /landmarks/ tras modificar los landmarks guardados."""
+    app.state.landmarks_json_bytes = None
+    app.state.landmarks_version += 1
+
+def discard_file(filepath: str):
+    if filepath and os.path.exists(filepath):
+        os.remove(filepath)
+
+# --- Endpoints ---
+
+@router.post("/add_landmark/", response_model=Landmark, status_code=201)
+async def add_landmark(
+    request: Request,
+    metadata_json: str = Form(..., description="Un string JSON que se valida con el schema LandmarkMetadata."),
+    image: UploadFile = File(...)
+):
+    """Recibe datos de un landmark, los analiza y los almacena."""
+    try:
+        metadata = LandmarkMetadata.model_validate_json(metadata_json)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Metadatos inválidos: {e.errors(include_url=False)}")
+
+    image_filepath = None
+    try:
+        gemini_service: GeminiService = request.app.state.gemini_service
+        if not gemini_service:
+            raise HTTPException(status_code=503, detail="El servicio de análisis de imágenes no está disponible.")
+
+        # El hash del archivo original es la clave de caché; Pillow decodifica directamente
+        # desde el archivo temporal de la subida, sin cargar los bytes originales en memoria.
+        image_hash = await hash_upload(image)
+        try:
+            image_bytes = await asyncio.to_thread(compress_image, image.file)
+        except UnidentifiedImageError:
+            raise HTTPException(status_code=400, detail="El archivo enviado no es una imagen válida.")
+
+        landmark_id = next_landmark_id()
+        image_filepath = os.path.join(LANDMARK_IMAGES_DIR, f"{landmark_id}.jpg")
+
+        # La escritura de la imagen y el análisis no dependen entre sí: se ejecutan en paralelo
+        analysis_result = gemini_service.get_cached_analysis(image_hash)
+        if analysis_result is None:
+            # return_exceptions: ambas tareas terminan antes de propagar un error, así
+            # discard_file no se adelanta a una escritura que sigue en curso
+            results = await asyncio.gather(
+                gemini_service.get_contextual_analysis(image_bytes, image_hash=image_hash),
+                write_image(image_filepath, image_bytes),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            analysis_result = results[0]
+        else:
+            await write_image(image_filepath, image_bytes)
+
+        if not analysis_result or not analysis_result.get("object_name"):
+            raise HTTPException(status_code=400, detail="No se pudo identificar un nombre de landmark válido.")
+
+        new_landmark = Landmark(
+            id=landmark_id,
+            name=analysis_result["object_name"],
+            location=metadata.position,
+            timestamp=metadata.timestamp,
+            best_image_path=os.path.abspath(image_filepath),
+            detailed_description=analysis_result["description"],
+            contextual_analysis=analysis_result["analysis"]
+        )
+
+        await asyncio.to_thread(request.app.state.landmark_store.add, new_landmark.model_dump(mode="json"))
+        invalidate_landmarks_json(request.app)
+        
+        logger.info(f"Nuevo landmark añadido: {new_landmark.name} (ID: {new_landmark.id})")
+        
+        return new_landmark
+
+    except HTTPException as http_exc:
+        discard_file(image_filepath)
+        raise http_exc
+    except Exception as e:
+        discard_file(image_filepath)
+        logger.error(f"Error inesperado en add_landmark: {e}")
+        raise HTTPException(status_code=500, detail="Error interno del servidor.")
+
+
+@router.get("/landmarks/", response_model=List[Landmark])
+async def get_landmarks(request: Request, limit: Optional[int] = Query(None, ge=1), offset: int = Query(0, ge=0)):
+    """
+    Devuelve los landmarks guardados en orden de inserción, con paginación opcional.
+    La lista completa se sirve desde un JSON ya serializado que se invalida al modificarla.
+    """
+    # Los datos del store ya fueron validados al insertarse: se serializan sin revalidar
+    store = request.app.state.landmark_store
+    if limit is not None or offset:
+        page = await asyncio.to_thread(store.list, limit, offset)
+        return Response(content=orjson.dumps(page), media_type="application/json")
+
+    state = request.app.state
+    content = state.landmarks_json_bytes
+    if content is None:
+        version = state.landmarks_version
+        content = orjson.dumps(await asyncio.to_thread(store.list))
+        # Solo se guarda si no hubo cambios mientras se leía la lista
+        if version == state.landmarks_version:
+            state.landmarks_json_bytes = content
+    return Response(content=content, media_type="application/json")
+
+@router.delete("/erase_last_landmark/", response_model=Landmark)
+async def erase_last_landmark(request: Request):
+    """Elimina el último landmark añadido junto con su imagen."""
+    landmark = await asyncio.to_thread(request.app.state.landmark_store.delete_last)
+    if landmark is None:
+        raise HTTPException(status_code=404, detail="No hay landmarks para eliminar.")
+    invalidate_landmarks_json(request.app)
+    discard_file(landmark.get("best_image_path"))
+    logger.info(f"Landmark eliminado: {landmark['name']} (ID: {landmark['id']})")
+    return landmark
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, FastAPI, Request
+import asyncio
+import logging
+from app.config import POSE_BATCH_SIZE, POSE_BATCH_WAIT, POSE_FLUSH_INTERVAL
+from app.schemas import PoseData, StatusResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# --- Escritura de la trayectoria en segundo plano ---
+def write_poses(app: FastAPI, batch: list, flush: bool):
+    """Escribe el lote en el archivo de trayectoria y, si flush, lo vuelca a disco. Se ejecuta en un hilo."""
+    data = "".join(f"{x},{y}\n" for x, y in batch)
+    with app.state.pose_file_lock:
+        app.state.pose_file.write(data)
+        if flush:
+            app.state.pose_file.flush()
+
+def drain_queue(queue: asyncio.Queue, batch: list):
+    """Añade al lote las poses ya encoladas sin ceder el event loop."""
+    while len(batch) < POSE_BATCH_SIZE:
+        try:
+            batch.append(queue.get_nowait())
+        except asyncio.QueueEmpty:
+            break
+
+async def pose_flusher(app: FastAPI):
+    """
+    Agrupa las poses encoladas y las escribe por lotes en el archivo de trayectoria.
+    Los futures encolados por sync_trajectory marcan una barrera: se resuelven cuando el lote
+    que los contiene (y por tanto todo lo encolado antes) está escrito y volcado a disco.
+    """
+    queue: asyncio.Queue = app.state.pose_queue
+    loop = asyncio.get_running_loop()
+    last_flush = loop.time()
+    while True:
+        batch = [await queue.get()]
+        drain_queue(queue, batch)
+        deadline = loop.time() + POSE_BATCH_WAIT
+        while len(batch) < POSE_BATCH_SIZE and not any(isinstance(item, asyncio.Future) for item in batch):
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+            drain_queue(queue, batch)
+        poses = [item for item in batch if not isinstance(item, asyncio.Future)]
+        barriers = [item for item in batch if isinstance(item, asyncio.Future)]
+        try:
+            # El formateo, la escritura y el flush se hacen fuera del event loop
+            flush = bool(barriers) or loop.time() - last_flush >= POSE_FLUSH_INTERVAL
+            await asyncio.to_thread(write_poses, app, poses, flush)
+            if flush:
+                last_flush = loop.time()
+        except Exception as e:
+            logger.error(f"Fallo al escribir en el archivo de trayectoria: {e}")
+        finally:
+            for barrier in barriers:
+                if not barrier.done():
+                    barrier.set_result(None)
+            for _ in batch:
+                queue.task_done()
+
+async def sync_trajectory(app: FastAPI):
+    """
+    Espera a que se escriban y vuelquen a disco las poses encoladas hasta ahora.
+    Las que lleguen después no alargan la espera, a diferencia de Queue.join().
+    """
+    barrier = asyncio.get_running_loop().create_future()
+    await app.state.pose_queue.put(barrier)
+    await barrier
+
+# --- Endpoints ---
+
+@router.post("/add_pose/", response_model=StatusResponse, status_code=201)
+async def add_pose(request: Request, data: PoseData):
+    pos = data.pose.position
+    # La escritura a disco la hace pose_flusher por lotes.
+    await request.app.state.pose_queue.put((pos.x, pos.y))
+    return StatusResponse(status="success", message="Pose guardada.")
@@ -0,0 +1,114 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import FileResponse
+import io
+import os
+import logging
+import shutil
+import asyncio
+from app.config import OUTPUT_DIR, TRAJECTORY_FILE, REPORT_CHUNK_SIZE, COPY_BUFFER_SIZE
+from app.report_generator import build_report
+from app.schemas import ReportResponse
+from app.routers.poses import sync_trajectory
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+def save_upload(upload: UploadFile, filepath: str):
+    """
+    Copia el archivo subido a disco. Si la subida tiene un descriptor de archivo se usa
+    os.sendfile (copia en el kernel); si no lo tiene, o sendfile no está disponible,
+    se copia con un búfer grande.
+    """
+    src = upload.file
+    with open(filepath, "wb") as dst:
+        if hasattr(os, "sendfile"):
+            try:
+                src_fd = src.fileno()
+            except (io.UnsupportedOperation, OSError):
+                src_fd = None
+            if src_fd is not None:
+                try:
+                    size = os.fstat(src_fd).st_size
+                    offset = 0
+                    while offset < size:
+                        sent = os.sendfile(dst.fileno(), src_fd, offset, size - offset)
+                        if sent == 0:
+                            break
+                        offset += sent
+                    return
+                except OSError:
+                    dst.seek(0)
+                    dst.truncate()
+        src.seek(0)
+        shutil.copyfileobj(src, dst, length=COPY_BUFFER_SIZE)
+
+@router.post("/generate_report/", response_model=ReportResponse)
+async def generate_and_save_report(
+    request: Request,
+    pgm_file: UploadFile = File(...),
+    yaml_file: UploadFile = File(...)
+):
+    """
+    Genera un informe en PDF usando los archivos de mapa y los datos guardados.
+    """
+    temp_pgm_path = os.path.join(OUTPUT_DIR, f"temp_{pgm_file.filename}")
+    temp_yaml_path = os.path.join(OUTPUT_DIR, f"temp_{yaml_file.filename}")
+    
+    try:
+        # Guardar los archivos de mapa subidos temporalmente
+        await asyncio.gather(
+            asyncio.to_thread(save_upload, pgm_file, temp_pgm_path),
+            asyncio.to_thread(save_upload, yaml_file, temp_yaml_path),
+        )
+
+        landmarks_list = await asyncio.to_thread(request.app.state.landmark_store.list)
+
+        if not landmarks_list:
+            raise HTTPException(status_code=404, detail="No hay landmarks para generar un informe.")
+
+        # Asegurar que todas las poses recibidas estén en el archivo de trayectoria
+        await sync_trajectory(request.app)
+
+        # Preparar los datos para el ReportGenerator
+        map_files = {
+            'pgm': temp_pgm_path, 
+            'yaml': temp_yaml_path,
+            'trajectory': TRAJECTORY_FILE
+        }
+
+        # El renderizado del mapa y del PDF se hace en otro proceso
+        loop = asyncio.get_running_loop()
+        pdf_filepath = await loop.run_in_executor(request.app.state.report_pool, build_report, landmarks_list, map_files)
+        
+        if not os.path.exists(pdf_filepath):
+            raise HTTPException(status_code=500, detail="El archivo del informe no fue creado.")
+
+        return ReportResponse(
+            status="success",
+            message="Informe generado.",
+            filepath=pdf_filepath,
+            url=str(request.url_for("download_report", filename=os.path.basename(pdf_filepath)))
+        )
+    except Exception as e:
+        logger.error(f"Fallo al generar el informe: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # La limpieza de los archivos temporales se maneja ahora dentro del ReportGenerator
+        pass
+
+@router.get("/reports/{filename}")
+async def download_report(filename: str):
+    """
+    Descarga un informe PDF generado previamente.
+    FileResponse envía el archivo directamente desde disco (zero-copy si el servidor soporta
+    la extensión pathsend), sin leer el PDF completo en memoria.
+    """
+    if filename != os.path.basename(filename) or not (filename.startswith("Report_") and filename.endswith(".pdf")):
+        raise HTTPException(status_code=400, detail="Nombre de informe inválido.")
+    pdf_filepath = os.path.join(OUTPUT_DIR, filename)
+    if not os.path.isfile(pdf_filepath):
+        raise HTTPException(status_code=404, detail="Informe no encontrado.")
+    response = FileResponse(pdf_filepath, media_type="application/pdf", filename=filename)
+    response.chunk_size = REPORT_CHUNK_SIZE
+    return response
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 import time
-from typing import Optional
+from typing import List, Optional
 
 class Position(BaseModel):
     """
@@ -10,11 +10,21 @@ class Position(BaseModel):
     y: float = Field(..., description="Coordenada Y en metros")
     z: float = Field(..., description="Coordenada Z en metros")
 
+class StrictPosition(Position):
+    """
+    Posición validada en modo estricto, para los metadatos de la subida de landmarks.
+    El modo estricto de un modelo no se propaga a sus modelos anidados.
+    """
+    model_config = ConfigDict(strict=True)
+
 class LandmarkMetadata(BaseModel):
     """
     Representa los metadatos enviados junto con la imagen del landmark durante la solicitud.
+    Se valida directamente desde el JSON en modo estricto, sin coerciones de tipo.
     """
-    position: Position
+    model_config = ConfigDict(strict=True)
+
+    position: StrictPosition
     timestamp: float = Field(default_factory=time.time, description="Timestamp Unix de cuando se capturó la imagen.")
 
 class Landmark(BaseModel):
@@ -22,7 +32,7 @@ class Landmark(BaseModel):
     Representa un registro de landmark completamente analizado y confirmado.
     Este es el modelo de datos principal almacenado en el estado de nuestra aplicación.
     """
-    id: str = Field(..., description="Identificador único para el landmark (ej., LM_1724298858_a3b1).")
+    id: str = Field(..., description="Identificador único para el landmark (ej., LM_1724298858_1f4a_00002a).")
     name: str = Field(..., description="El nombre o categoría del objeto, según lo identificado por el modelo.")
     location: Position = Field(..., description="La posición 3D estimada del landmark.")
     timestamp: float = Field(..., description="Timestamp Unix de la observación.")
@@ -30,6 +40,17 @@ class Landmark(BaseModel):
     detailed_description: Optional[str] = Field(None, description="Una descripción visual detallada del modelo.")
     contextual_analysis: Optional[str] = Field(None, description="Análisis contextual sobre el origen, utilidad e importancia del objeto.")
 
+# Valida listas de landmarks en bloque, compilando el schema una sola vez.
+LANDMARK_LIST_ADAPTER = TypeAdapter(List[Landmark])
+
+class LandmarkAnalysis(BaseModel):
+    """
+    Esquema de salida estructurada que Gemini debe respetar al analizar la imagen de un landmark.
+    """
+    object_name: str = Field(..., description="Nombre técnico y específico del objeto.")
+    description: str = Field(..., description="Una sola oración concisa con las características físicas clave del objeto.")
+    analysis: str = Field(..., description="Análisis breve del origen probable, la utilidad potencial y la relevancia del objeto.")
+
 class Orientation(BaseModel):
     """Define la orientación del rover."""
     roll: float
@@ -43,4 +64,14 @@ class Pose(BaseModel):
 
 class PoseData(BaseModel):
     """El modelo raíz para los datos de pose recibidos."""
-    pose: Pose
\ No newline at end of file
+    pose: Pose
+
+class StatusResponse(BaseModel):
+    """Respuesta genérica de confirmación de una operación."""
+    status: str
+    message: str
+
+class ReportResponse(StatusResponse):
+    """Respuesta de la generación de un informe."""
+    filepath: str = Field(..., description="Ruta del PDF generado en el servidor.")
+    url: str = Field(..., description="URL para descargar el PDF.")
@@ -1,8 +1,6 @@
 import os
-import time
 from PIL import Image, ImageDraw
 import numpy as np
-import shutil
 
 # Importar la clase refactorizada desde el mismo directorio de la app
 from report_generator import ReportGenerator
@@ -28,11 +26,9 @@ def create_dummy_trajectory_file(filepath: str):
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     print(f"Creando archivo de trayectoria de prueba en: {filepath}")
     try:
-        with open(filepath, "w") as f:
-            x = np.linspace(100, 130, 50)
-            y = 5 * np.sin(np.linspace(0, 2 * np.pi, 50)) - 40
-            for i in range(len(x)):
-                f.write(f"{x[i]:.4f},{y[i]:.4f}\n")
+        x = np.linspace(100, 130, 50)
+        y = 5 * np.sin(np.linspace(0, 2 * np.pi, 50)) - 40
+        np.savetxt(filepath, np.column_stack([x, y]), fmt='%.4f', delimiter=',')
     except Exception as e:
         print(f"No se pudo crear el archivo de trayectoria de prueba: {e}")
         raise
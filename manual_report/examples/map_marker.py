@@ -9,7 +9,11 @@ import math
 import yaml
 import cv2
 import numpy as np
-import json 
+try:
+    import orjson as _json
+except ImportError:  # stdlib fallback; json.loads also accepts bytes
+    import json as _json
+
 def load_map_and_metadata(yaml_path):
     with open(yaml_path, 'r') as f:
         meta = yaml.safe_load(f)
@@ -58,6 +62,33 @@ def world_to_pixel(wx, wy, meta, img_shape):
     in_bounds = (0 <= col < img_w) and (0 <= row_top < img_h)
     return col, row_top, in_bounds
 
+def world_to_pixel_batch(wx, wy, meta, img_shape):
+    """
+    Vectorized world_to_pixel over arrays of world coordinates.
+    Returns (cols, rows_top, in_bounds) as NumPy arrays.
+    """
+    res = float(meta['resolution'])
+    ox, oy, oyaw = meta.get('origin', [0.0, 0.0, 0.0])
+    yaw = float(oyaw)
+
+    dx = np.asarray(wx, dtype=np.float64) - float(ox)
+    dy = np.asarray(wy, dtype=np.float64) - float(oy)
+    if yaw == 0.0:
+        # unrotated map: skip the rotation entirely
+        x_map, y_map = dx, dy
+    else:
+        cosy = math.cos(yaw)
+        siny = math.sin(yaw)
+        x_map =  cosy * dx + siny * dy
+        y_map = -siny * dx + cosy * dy
+
+    img_h, img_w = img_shape[0], img_shape[1]
+    cols = np.floor(x_map / res).astype(np.int32)
+    rows_top = (img_h - 1) - np.floor(y_map / res).astype(np.int32)
+
+    in_bounds = (cols >= 0) & (cols < img_w) & (rows_top >= 0) & (rows_top < img_h)
+    return cols, rows_top, in_bounds
+
 def pixel_to_world(col, row_top, meta, img_shape):
     """
     Convert OpenCV pixel coords (col, row_top) -> world (wx,wy).
@@ -82,6 +113,16 @@ def pixel_to_world(col, row_top, meta, img_shape):
     wy = oy + siny * x_map + cosy * y_map
     return wx, wy
 
+def marker_offsets(radius, thickness):
+    """
+    (drow, dcol) offsets of the pixels cv2.circle paints for a marker centered at (0, 0).
+    """
+    pad = radius + max(thickness, 0) + 1
+    stamp = np.zeros((2 * pad + 1, 2 * pad + 1), np.uint8)
+    cv2.circle(stamp, (pad, pad), radius, 255, thickness)
+    drow, dcol = np.nonzero(stamp)
+    return drow - pad, dcol - pad
+
 def annotate_map(yaml_path, json_path, out_path="annotated_map.png",
                  marker_color=(0,0,255), marker_radius=6, marker_thickness=-1,
                  draw_labels=True):
@@ -93,22 +134,39 @@ def annotate_map(yaml_path, json_path, out_path="annotated_map.png",
     if len(origin) < 3:
         origin = [float(origin[0]), float(origin[1]), 0.0]
     meta['origin'] = [float(origin[0]), float(origin[1]), float(origin[2])]
-    with open(json_path, 'r') as f:
-        markers = json.load(f)
-
-    for marker in markers:
-        name = marker.get("name", "?")
-        wx, wy = float(marker["x"]), float(marker["y"])
-        col, row_top, in_bounds = world_to_pixel(wx, wy, meta, img_gray.shape)
-        if in_bounds:
-            cv2.circle(img_color, (col, row_top), marker_radius, marker_color, marker_thickness)
-            if draw_labels:
-                label = f"{name}: ({wx:.2f},{wy:.2f})"
-                # put text slightly above the circle (ensure within image)
-                text_pos = (max(0, col+8), max(12, row_top-8))
-                cv2.putText(img_color, label, text_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.4, marker_color, 1, cv2.LINE_AA)
-        else:
-            print(f"WARNING: world point {name} ({wx},{wy}) -> pixel ({col},{row_top}) is OUT OF IMAGE BOUNDS [{w}x{h}]")
+    with open(json_path, 'rb') as f:
+        markers = _json.loads(f.read())
+
+    wxs = np.array([float(marker["x"]) for marker in markers], dtype=np.float64)
+    wys = np.array([float(marker["y"]) for marker in markers], dtype=np.float64)
+    cols, rows_top, in_bounds_all = world_to_pixel_batch(wxs, wys, meta, img_gray.shape)
+
+    # stamp all in-bounds markers in one indexed assignment (clipped at the image border)
+    drow, dcol = marker_offsets(marker_radius, marker_thickness)
+    rr = (rows_top[in_bounds_all, None] + drow).ravel()
+    cc = (cols[in_bounds_all, None] + dcol).ravel()
+    visible = (rr >= 0) & (rr < h) & (cc >= 0) & (cc < w)
+    # pad the color to the channel count (BGRA maps) with zeros, as cv2.circle does
+    channels = img_color.shape[2]
+    img_color[rr[visible], cc[visible]] = tuple(marker_color)[:channels] + (0,) * (channels - len(marker_color))
+
+    if draw_labels:
+        valid = np.flatnonzero(in_bounds_all)
+        for i, wx, wy, col, row_top in zip(valid.tolist(), wxs[valid].tolist(), wys[valid].tolist(),
+                                           cols[valid].tolist(), rows_top[valid].tolist()):
+            label = f"{markers[i].get('name', '?')}: ({wx:.2f},{wy:.2f})"
+            # put text slightly above the circle (ensure within image)
+            text_pos = (max(0, col+8), max(12, row_top-8))
+            cv2.putText(img_color, label, text_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.4, marker_color, 1, cv2.LINE_AA)
+
+    # report every out-of-bounds marker in one write
+    outside = np.flatnonzero(~in_bounds_all)
+    if outside.size:
+        print("\n".join(
+            f"WARNING: world point {markers[i].get('name', '?')} ({wx},{wy}) -> pixel ({col},{row_top}) is OUT OF IMAGE BOUNDS [{w}x{h}]"
+            for i, wx, wy, col, row_top in zip(outside.tolist(), wxs[outside].tolist(), wys[outside].tolist(),
+                                               cols[outside].tolist(), rows_top[outside].tolist())
+        ))
 
     # Save annotated image
     cv2.imwrite(out_path, img_color)
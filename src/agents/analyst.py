@@ -1,20 +1,16 @@
 # agents/analyst.py
-import uuid
-from typing import List
+from typing import List, Optional
 from states.preprocessed_video_segment_state import PreprocessedVideoSegmentState
 from states.analyzed_video_segment_state import AnalyzedVideoSegmentState, LandmarkObservation
-from utils.gemini_client import get_gemini_model, generate_analysis_from_video_file
+from utils.gemini_client import get_gemini_model, MODEL_NAME
 import asyncio
+import hashlib
+import os
+import re
 from google.genai import types
 
-class AnalystAgent:
-    def __init__(self):
-        self.gemini_model = get_gemini_model()
-        if not self.gemini_model:
-            print("AnalystAgent: WARNING - Gemini Model not initialized.")
-
-    def _build_prompt_for_video_analysis(self, segment_info: PreprocessedVideoSegmentState) -> str:
-        prompt = f"""
+# The prompt does not depend on the segment, so it is built once at import.
+_VIDEO_ANALYSIS_PROMPT = """
         Analyze the provided video segment.
 
         **Primary Objective:**
@@ -55,36 +51,64 @@ class AnalystAgent:
         `No significant landmarks found in this segment.`
         - The timestamp will appear in the upper central part of the video segment, writte it in milliseconds.
         """
-        return prompt
+
+# Body of one observation block; a block missing its END marker runs up to the next START
+_BLOCK_RE = re.compile(
+    r'LANDMARK_OBSERVATION_START(.*?)(?:LANDMARK_OBSERVATION_END|(?=LANDMARK_OBSERVATION_START)|\Z)',
+    re.S,
+)
+# One "KEY: value" line of a LANDMARK_OBSERVATION block
+_FIELD_RE = re.compile(
+    r'^[ \t]*(NAME|START_TIMESTAMP_MS|END_TIMESTAMP_MS|BEST_VISIBILITY_TIMESTAMP_MS):[ \t]*(.*?)[ \t]*$',
+    re.M,
+)
+# Values int() accepts; anything else parses as 0 without raising
+_INT_RE = re.compile(r'\s*[+-]?\d+\s*')
+
+def _parse_timestamp_ms(value: str) -> int:
+    return int(value) if _INT_RE.fullmatch(value) else 0
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _response_cache_key(video_digest: str, prompt: str) -> str:
+    prompt_digest = hashlib.blake2b(f"{MODEL_NAME}\n{prompt}".encode("utf-8"), digest_size=16).hexdigest()
+    return f"{video_digest}_{prompt_digest}"
+
+async def _bounded(semaphore: asyncio.Semaphore, coro):
+    async with semaphore:
+        return await coro
+
+class AnalystAgent:
+    def __init__(self):
+        self.gemini_model = get_gemini_model()
+        # Upper bound on Gemini uploads/requests in flight, to stay within the API rate limits
+        self.max_concurrency = max(1, int(os.getenv("GEMINI_CONCURRENCY", 8)))
+        # Missions with at least this many segments go through the Gemini Batch API (cheaper,
+        # but it can take hours). Unset or 0 keeps every mission on direct requests.
+        self.batch_min_segments = int(os.getenv("GEMINI_BATCH_MIN_SEGMENTS", 0))
+        # Gemini responses cached by segment content + prompt. Opt-in: unset or empty disables the cache
+        self.cache_dir = os.getenv("ANALYST_CACHE_DIR") or None
+        if not self.gemini_model:
+            print("AnalystAgent: WARNING - Gemini Model not initialized.")
+
+    def _build_prompt_for_video_analysis(self, segment_info: PreprocessedVideoSegmentState) -> str:
+        return _VIDEO_ANALYSIS_PROMPT
 
     def _parse_gemini_video_response(self, response_text: str) -> List[LandmarkObservation]:
         observations: List[LandmarkObservation] = []
-        clean_response_text = response_text.strip()
-
-        parts = clean_response_text.split("LANDMARK_OBSERVATION_START")
-        for part in parts[1:]:
-            obs_data_str = part.split("LANDMARK_OBSERVATION_END")[0].strip()
-            
-            start_ts, end_ts, best_ts = 0, 0, 0
-
-            for line in obs_data_str.split('\n'):
-                if line.startswith("NAME:"):
-                    name = line.split("NAME:", 1)[1].strip()
-                elif line.startswith("START_TIMESTAMP_MS:"):
-                    try: start_ts = int(line.split("START_TIMESTAMP_MS:", 1)[1].strip())
-                    except ValueError: start_ts = 0
-                elif line.startswith("END_TIMESTAMP_MS:"):
-                    try: end_ts = int(line.split("END_TIMESTAMP_MS:", 1)[1].strip())
-                    except ValueError: end_ts = 0
-                elif line.startswith("BEST_VISIBILITY_TIMESTAMP_MS:"):
-                    try: best_ts = int(line.split("BEST_VISIBILITY_TIMESTAMP_MS:", 1)[1].strip())
-                    except ValueError: best_ts = 0
-            
+        for obs_data_str in _BLOCK_RE.findall(response_text):
+            # A repeated key keeps its last value, as the line-by-line parser did
+            fields = dict(_FIELD_RE.findall(obs_data_str))
             observations.append(LandmarkObservation(
-                landmark_name=name,
-                start_timestamp_in_segment_ms=start_ts,
-                end_timestamp_in_segment_ms=end_ts,
-                best_visibility_timestamp_in_segment_ms=best_ts
+                landmark_name=fields.get("NAME", ""),
+                start_timestamp_in_segment_ms=_parse_timestamp_ms(fields.get("START_TIMESTAMP_MS", "0")),
+                end_timestamp_in_segment_ms=_parse_timestamp_ms(fields.get("END_TIMESTAMP_MS", "0")),
+                best_visibility_timestamp_in_segment_ms=_parse_timestamp_ms(fields.get("BEST_VISIBILITY_TIMESTAMP_MS", "0"))
             ))
         return observations
 
@@ -106,25 +130,94 @@ class AnalystAgent:
             identified_landmark_observations=landmark_observations
         )
     
+    def _load_cached_response(self, key: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.txt"), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _store_response(self, key: str, text: Optional[str]):
+        if not self.cache_dir or not isinstance(text, str):
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = os.path.join(self.cache_dir, f"{key}.txt.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, os.path.join(self.cache_dir, f"{key}.txt"))
+        except OSError as e:
+            print(f"Analyst Agent: WARNING - Could not cache the Gemini response: {e}")
+
     async def analysis_responses(self, segments_prompt_video: List[tuple]) -> List[types.GenerateContentResponse]:        
-        api_tasks = [self.gemini_model.generate_content_from_video(prompt= data[0], video_bytes= data[1]) for data in segments_prompt_video]
+        if 0 < self.batch_min_segments <= len(segments_prompt_video):
+            results = await self.gemini_model.generate_content_from_video_files_batch(segments_prompt_video)
+            # A partially successful job leaves None for its failed requests; those go out directly
+            failed = [i for i, response in enumerate(results) if response is None]
+            if failed:
+                print(f"Analyst Agent: Retrying {len(failed)} segment(s) that failed in the batch with direct requests.")
+                retried = await self._direct_responses([segments_prompt_video[i] for i in failed])
+                for i, response in zip(failed, retried):
+                    results[i] = response
+            return results
+        return await self._direct_responses(segments_prompt_video)
+
+    async def _direct_responses(self, segments_prompt_video: List[tuple]) -> List[types.GenerateContentResponse]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        api_tasks = [_bounded(semaphore, self.gemini_model.generate_content_from_video_file(prompt= data[0], video_file= data[1]))
+                     for data in segments_prompt_video]
         results = await asyncio.gather(*api_tasks)
         return results
 
     async def run(self, video_segments: List[PreprocessedVideoSegmentState]) -> List[AnalyzedVideoSegmentState]:
         print(f"Analyst Agent: Starting analysis for {len(video_segments)} segment(s)...")
         analyzed_segments_list: List[AnalyzedVideoSegmentState] = []
-        segments_prompt_video = [(self._build_prompt_for_video_analysis(segment_state), open(segment_state["video_segment_path"], 'rb').read()) \
-                                 for segment_state in video_segments]
-        
-        # running asynchronously
-        gemini_responses = await self.analysis_responses(segments_prompt_video)
-
-        print(gemini_responses[0].text)
-
-        for segment, response in zip(video_segments, gemini_responses):
+        prompts = [self._build_prompt_for_video_analysis(segment_state) for segment_state in video_segments]
+        # Gemini gets the reduced copy; the full segment is kept for frame extraction
+        segment_paths = [segment_state["analysis_video_path"] for segment_state in video_segments]
+
+        # An unchanged segment analyzed with the same prompt and model reuses the cached response
+        if self.cache_dir:
+            unique_paths = list(dict.fromkeys(segment_paths))
+            digests = dict(zip(unique_paths, await asyncio.gather(*(asyncio.to_thread(_file_digest, path) for path in unique_paths))))
+            keys = [_response_cache_key(digests[path], prompt) for path, prompt in zip(segment_paths, prompts)]
+        else:
+            keys = [f"{path}\n{prompt}" for path, prompt in zip(segment_paths, prompts)]
+        unique_keys = list(dict.fromkeys(keys))
+        if self.cache_dir:
+            response_texts = dict(zip(unique_keys, await asyncio.gather(
+                *(asyncio.to_thread(self._load_cached_response, key) for key in unique_keys)
+            )))
+        else:
+            response_texts = dict.fromkeys(unique_keys)
+        pending = {key: (prompt, path) for key, prompt, path in zip(keys, prompts, segment_paths) if response_texts[key] is None}
+        if len(pending) < len(response_texts):
+            print(f"Analyst Agent: {len(response_texts) - len(pending)} segment(s) answered from the cache.")
+
+        if pending:
+            # Each segment is uploaded once through the Files API; the requests only reference it
+            pending_paths = list(dict.fromkeys(path for _, path in pending.values()))
+            upload_semaphore = asyncio.Semaphore(self.max_concurrency)
+            uploaded = dict(zip(pending_paths, await asyncio.gather(
+                *(_bounded(upload_semaphore, self.gemini_model.upload_video(path)) for path in pending_paths)
+            )))
+            segments_prompt_video = [(prompt, uploaded[path]) for prompt, path in pending.values()]
+
+            # running asynchronously
+            gemini_responses = await self.analysis_responses(segments_prompt_video)
+            for key, response in zip(pending, gemini_responses):
+                response_texts[key] = response.text
+            if self.cache_dir:
+                await asyncio.gather(*(asyncio.to_thread(self._store_response, key, response_texts[key]) for key in pending))
+
+        if keys:
+            print(response_texts[keys[0]])
+
+        for segment, key in zip(video_segments, keys):
             analyzed_segment = self.analyze_video_segment(
-                gemini_response_text=response.text, 
+                gemini_response_text=response_texts[key], 
                 segment_state=segment
             )
             analyzed_segments_list.append(analyzed_segment)
@@ -1,75 +1,208 @@
 # agents/identifier.py
 import os
-import uuid
-from typing import List, Dict, Tuple
+from typing import Dict, List, Optional, Tuple
 from states import (
     ConfirmedLandmarkState,
     IdentifiedLandmarksBatchState,
     RobotPose
 )
 from states.analyzed_video_segment_state import AnalyzedVideoSegmentState
-from utils.gemini_client import get_gemini_model, generate_text 
+from utils.gemini_client import get_gemini_model
 from google.genai import types
 import cv2  
 import asyncio
+import bisect
+import re
+import shutil
+import subprocess
+
+# Section tags of the contextual analysis response, at the start of a line
+_CTX_TAG_RE = re.compile(r'^[ \t]*(OBJECT_NAME|DETAILED_DESCRIPTION|CONTEXTUAL_ANALYSIS):', re.M)
+
+class _RateLimiter:
+    """Spaces the start of consecutive requests at least 60/rpm seconds apart."""
+    def __init__(self, rpm: int):
+        self._interval = 60.0 / rpm
+        self._next_start = 0.0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        delay = self._next_start - now
+        self._next_start = max(now, self._next_start) + self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
 
 class IdentifierAgent:
-    def __init__(self, output_landmark_image_dir: str = "output/landmark_images"):
+    def __init__(self, output_landmark_image_dir: str = "output/landmark_images",
+                 max_concurrency: Optional[int] = None, rpm: Optional[int] = None):
         self.gemini_model = get_gemini_model()
+        # Upper bound on Gemini requests in flight, and on requests started per minute (0 = no limit)
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv("GEMINI_CONCURRENCY", 8)))
+        self.rpm = rpm if rpm is not None else int(os.getenv("GEMINI_RPM", 0))
         self.output_landmark_image_dir = output_landmark_image_dir
+        # Distancia en fotogramas a partir de la cual se hace seek en vez de avanzar con grab()
+        self.FRAME_SEEK_THRESHOLD = 250
+        self.ffmpeg_path = shutil.which("ffmpeg")
+        # Lado máximo y calidad JPEG de las imágenes de landmarks (para el informe y para Gemini)
+        self.LANDMARK_IMAGE_MAX_SIDE = 1024
+        self.LANDMARK_JPEG_QUALITY = 85
+        # Segmentos que se decodifican a la vez
+        self.max_extraction_workers = os.cpu_count() or 1
         if not os.path.exists(self.output_landmark_image_dir):
             os.makedirs(self.output_landmark_image_dir, exist_ok=True)
 
         if not self.gemini_model:
             print("IdentifierAgent: WARNING - Gemini not initialized. Contextual Analysis won't work.")
 
-    def _extract_specific_frame(self, video_path: str, timestamp_ms: int, output_image_path: str) -> bool:
+    def _write_frame(self, output_image_path: str, frame) -> Optional[bytes]:
+        """
+        Reduce el fotograma a LANDMARK_IMAGE_MAX_SIDE si hace falta, lo codifica según la extensión
+        de la ruta, lo guarda y retorna los bytes guardados.
         """
-        Extrae un fotograma de un video en un timestamp específico y lo guarda.
-        Retorna True si tiene éxito, False en caso contrario.
+        try:
+            scale = self.LANDMARK_IMAGE_MAX_SIDE / max(frame.shape[:2])
+            if scale < 1:
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            ok, buffer = cv2.imencode(
+                os.path.splitext(output_image_path)[1] or ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.LANDMARK_JPEG_QUALITY]
+            )
+            if not ok:
+                raise ValueError("cv2.imencode failed")
+            image_bytes = buffer.tobytes()
+            with open(output_image_path, 'wb') as f:
+                f.write(image_bytes)
+            return image_bytes
+        except Exception as e:
+            print(f"Error _write_frame: Al guardar fotograma extraído en {output_image_path}: {e}")
+            return None
+
+    @staticmethod
+    def _read_image(image_path: str) -> Optional[bytes]:
+        try:
+            with open(image_path, 'rb') as f:
+                return f.read() or None
+        except FileNotFoundError:
+            return None
+
+    def _extract_frames_batch(self, video_path: str, timestamps_ms: List[int], output_image_paths: List[str]) -> List[Optional[bytes]]:
+        """
+        Extrae los fotogramas de un video en los timestamps dados y los guarda.
+        Usa una sola llamada a ffmpeg con seek por keyframe si está disponible, y OpenCV para
+        lo que ffmpeg no haya podido extraer.
+        Retorna, para cada imagen de salida, los bytes guardados, o None si no se pudo extraer.
         """
         if not os.path.exists(video_path):
-            print(f"Error _extract_specific_frame: El archivo de video no existe en {video_path}")
-            return False
-            
+            print(f"Error _extract_frames_batch: El archivo de video no existe en {video_path}")
+            return [None] * len(output_image_paths)
+
+        clamped_timestamps_ms = []
+        for timestamp_ms in timestamps_ms:
+            # Asegurarse que el timestamp no sea negativo
+            if timestamp_ms < 0:
+                print(f"Advertencia _extract_frames_batch: Timestamp negativo ({timestamp_ms}ms) para video {video_path}. Usando 0ms.")
+                timestamp_ms = 0
+            clamped_timestamps_ms.append(timestamp_ms)
+
+        if self.ffmpeg_path:
+            results = self._extract_frames_ffmpeg(video_path, clamped_timestamps_ms, output_image_paths)
+        else:
+            results = [None] * len(output_image_paths)
+
+        pending = [i for i, image_bytes in enumerate(results) if image_bytes is None]
+        if pending:
+            opencv_results = self._extract_frames_opencv(
+                video_path, [clamped_timestamps_ms[i] for i in pending], [output_image_paths[i] for i in pending]
+            )
+            for i, image_bytes in zip(pending, opencv_results):
+                results[i] = image_bytes
+        return results
+
+    def _extract_frames_ffmpeg(self, video_path: str, timestamps_ms: List[int], output_image_paths: List[str]) -> List[Optional[bytes]]:
+        """
+        Extrae todos los fotogramas con un solo proceso de ffmpeg. Cada timestamp es una entrada
+        con -ss antes de -i, así que ffmpeg salta al keyframe anterior en vez de decodificar desde el inicio.
+        """
+        cmd = [self.ffmpeg_path, "-y", "-v", "error"]
+        for timestamp_ms in timestamps_ms:
+            cmd += ["-ss", f"{timestamp_ms / 1000:.3f}", "-i", video_path]
+        # Reduce sin ampliar hasta caber en LANDMARK_IMAGE_MAX_SIDE; -q:v 4 equivale aproximadamente a calidad JPEG 85
+        max_side = self.LANDMARK_IMAGE_MAX_SIDE
+        scale = f"scale='min({max_side},iw)':'min({max_side},ih)':force_original_aspect_ratio=decrease"
+        for k, output_image_path in enumerate(output_image_paths):
+            cmd += ["-map", f"{k}:v:0", "-frames:v", "1", "-vf", scale, "-q:v", "4", output_image_path]
+
+        for output_image_path in output_image_paths:
+            # Para no confundir una imagen de una ejecución anterior con una extraída ahora
+            if os.path.exists(output_image_path):
+                os.remove(output_image_path)
+        try:
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except subprocess.CalledProcessError as e:
+            print(f"Advertencia _extract_frames_ffmpeg: ffmpeg falló para {video_path}, usando OpenCV: {e.stderr.decode() if e.stderr else 'N/A'}")
+            return [None] * len(output_image_paths)
+        except FileNotFoundError:
+            print("Advertencia _extract_frames_ffmpeg: ffmpeg not found, usando OpenCV.")
+            return [None] * len(output_image_paths)
+        return [self._read_image(path) for path in output_image_paths]
+
+    def _extract_frames_opencv(self, video_path: str, timestamps_ms: List[int], output_image_paths: List[str]) -> List[Optional[bytes]]:
+        """
+        Extrae los fotogramas de una sola pasada con OpenCV. Los timestamps se recorren en orden
+        con grab(), decodificando solo los fotogramas pedidos, y se salta con un seek cuando
+        el siguiente está lejos.
+        """
+        results = [None] * len(output_image_paths)
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
-            print(f"Error _extract_specific_frame: No se pudo abrir el video {video_path}")
-            return False
-        
-        # Asegurarse que el timestamp no sea negativo
-        if timestamp_ms < 0:
-            print(f"Advertencia _extract_specific_frame: Timestamp negativo ({timestamp_ms}ms) para video {video_path}. Usando 0ms.")
-            timestamp_ms = 0
-
-        cap.set(cv2.CAP_PROP_POS_MSEC, float(timestamp_ms))
-        ret, frame = cap.read()
-        cap.release()
-
-        if ret and frame is not None:
-            try:
-                cv2.imwrite(output_image_path, frame)
-                return True
-            except Exception as e:
-                print(f"Error _extract_specific_frame: Al guardar fotograma extraído en {output_image_path}: {e}")
-                return False
-        else:
-            if timestamp_ms > 0:
-                print(f"Advertencia _extract_specific_frame: No se pudo leer el fotograma en {timestamp_ms}ms del video {video_path}. Intentando con el primer fotograma.")
-                cap = cv2.VideoCapture(video_path)
-                if cap.isOpened():
-                    ret_fallback, frame_fallback = cap.read()
-                    cap.release()
+            print(f"Error _extract_frames_opencv: No se pudo abrir el video {video_path}")
+            return results
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        targets = sorted(
+            (int(timestamp_ms / 1000 * fps) if fps > 0 else 0, timestamp_ms, i) for i, timestamp_ms in enumerate(timestamps_ms)
+        )
+
+        missing = []
+        next_frame = 0  # Índice del fotograma que devolverá el próximo grab()
+        frame_idx, frame = -1, None
+        try:
+            for target, timestamp_ms, i in targets:
+                if target != frame_idx:
+                    if target - next_frame > self.FRAME_SEEK_THRESHOLD:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                        next_frame = target
+                    grabbed = next_frame <= target
+                    while grabbed and next_frame <= target:
+                        grabbed = cap.grab()
+                        next_frame += 1
+                    ret, frame = cap.retrieve() if grabbed else (False, None)
+                    frame_idx = target if ret and frame is not None else -1
+                if frame_idx == target:
+                    results[i] = self._write_frame(output_image_paths[i], frame)
+                elif timestamp_ms > 0:
+                    print(f"Advertencia _extract_frames_opencv: No se pudo leer el fotograma en {timestamp_ms}ms del video {video_path}. Intentando con el primer fotograma.")
+                    missing.append(i)
+                else:
+                    print(f"Error _extract_frames_opencv: Was not possible to recover the fotogram from {video_path} for the timestamp {timestamp_ms}ms.")
+
+            if missing:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret_fallback, frame_fallback = cap.read()
+                for i in missing:
                     if ret_fallback and frame_fallback is not None:
-                        try:
-                            cv2.imwrite(output_image_path, frame_fallback)
-                            print(f"Fotograma de fallback (inicio) para landmark guardado en: {output_image_path}")
-                            return True
-                        except Exception as e_fallback:
-                            print(f"Error _extract_specific_frame: Al guardar fotograma de fallback: {e_fallback}")
-                            return False
-            print(f"Error _extract_specific_frame: Was not possible to recover the fotogram from {video_path} for the timestamp {timestamp_ms}ms.")
-            return False
+                        results[i] = self._write_frame(output_image_paths[i], frame_fallback)
+                    if results[i] is not None:
+                        print(f"Fotograma de fallback (inicio) para landmark guardado en: {output_image_paths[i]}")
+                    else:
+                        print(f"Error _extract_frames_opencv: Was not possible to recover the fotogram from {video_path} for the timestamp {timestamps_ms[i]}ms.")
+        finally:
+            cap.release()
+        return results
+
+    async def _extract_segment_frames(self, semaphore: asyncio.Semaphore, video_path: str, timestamps_ms: List[int], output_image_paths: List[str]) -> List[Optional[bytes]]:
+        # OpenCV libera el GIL al decodificar, así que cada segmento se extrae en su propio hilo
+        async with semaphore:
+            return await asyncio.to_thread(self._extract_frames_batch, video_path, timestamps_ms, output_image_paths)
 
     def _build_contextual_analysis_prompt(self, landmark_hint:str = None) -> str:
         """
@@ -97,7 +230,8 @@ class IdentifierAgent:
         Parsea la respuesta del análisis contextual de Gemini.
         Retorna (object_name, detailed_description, contextual_analysis_text).
         """
-        ctx_analysis = "Contextual Analysis not available"
+        obj_name = "Unknown Object"
+        sections = {"DETAILED_DESCRIPTION": [], "CONTEXTUAL_ANALYSIS": []}
 
         clean_text = response_text.strip()
         if clean_text.startswith("```") and clean_text.endswith("```"):
@@ -105,48 +239,43 @@ class IdentifierAgent:
             if clean_text.lower().startswith("json"): 
                  clean_text = clean_text[len("json"):].strip()
 
-        current_section = None
-        temp_det_desc = []
-        temp_ctx_analysis = []
-
-        for line in clean_text.split('\n'):
-            line_stripped = line.strip()
-            if line_stripped.startswith("OBJECT_NAME:"):
-                obj_name = line_stripped.split("OBJECT_NAME:", 1)[1].strip()
-                current_section = "name"
-            elif line_stripped.startswith("DETAILED_DESCRIPTION:"):
-                det_desc_part = line_stripped.split("DETAILED_DESCRIPTION:", 1)[1].strip()
-                if det_desc_part: temp_det_desc.append(det_desc_part)
-                current_section = "description"
-            elif line_stripped.startswith("CONTEXTUAL_ANALYSIS:"):
-                ctx_analysis_part = line_stripped.split("CONTEXTUAL_ANALYSIS:", 1)[1].strip()
-                if ctx_analysis_part: temp_ctx_analysis.append(ctx_analysis_part)
-                current_section = "context"
-            elif current_section == "description" and line_stripped:
-                temp_det_desc.append(line_stripped)
-            elif current_section == "context" and line_stripped:
-                temp_ctx_analysis.append(line_stripped)
-        
-        if temp_det_desc:
-            det_desc = "\n".join(temp_det_desc)
-        if temp_ctx_analysis:
-            ctx_analysis = "\n".join(temp_ctx_analysis)
-            
+        # split() alterna [texto previo, etiqueta, contenido, etiqueta, contenido, ...]
+        parts = _CTX_TAG_RE.split(clean_text)
+        for tag, body in zip(parts[1::2], parts[2::2]):
+            if tag == "OBJECT_NAME":
+                obj_name = body.split('\n', 1)[0].strip()
+            else:
+                sections[tag].extend(line for line in map(str.strip, body.split('\n')) if line)
+
+        det_desc = "\n".join(sections["DETAILED_DESCRIPTION"])
+        ctx_analysis = "\n".join(sections["CONTEXTUAL_ANALYSIS"]) or "Contextual Analysis not available"
         return obj_name, det_desc, ctx_analysis
 
 
-    def _find_closest_robot_pose(self, target_timestamp_ms: int, all_poses: List[RobotPose]) -> RobotPose:
+    def _find_closest_robot_pose(self, target_timestamp_ms: int, all_poses: List[RobotPose], pose_timestamps: List[int]) -> RobotPose:
         """
         Encuentra la pose del robot más cercana a un timestamp global dado.
+        all_poses debe estar ordenada por timestamp y pose_timestamps contener sus timestamps,
+        para buscar por bisección.
         """
         if not all_poses:
             return RobotPose(timestamp_ms=target_timestamp_ms, x=0.0, y=0.0, orientation_degrees=0.0)
-        
-        closest_pose = min(all_poses, key=lambda pose: abs(pose['timestamp_ms'] - target_timestamp_ms))
-        return closest_pose
+
+        i = bisect.bisect_left(pose_timestamps, target_timestamp_ms)
+        if i == len(pose_timestamps) or (i > 0 and target_timestamp_ms - pose_timestamps[i - 1] <= pose_timestamps[i] - target_timestamp_ms):
+            i -= 1
+        return all_poses[i]
     
+    async def _identify(self, semaphore: asyncio.Semaphore, limiter: Optional[_RateLimiter], prompt: str, image_bytes: bytes) -> types.GenerateContentResponse:
+        async with semaphore:
+            if limiter:
+                await limiter.wait()
+            return await self.gemini_model.generate_content_from_image(prompt, image_bytes)
+
     async def identify_responses(self, segments_prompt_image: List[tuple]) -> List[types.GenerateContentResponse]:
-        api_tasks = [self.gemini_model.generate_content_from_image(data[0],data[1]) for data in segments_prompt_image]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limiter = _RateLimiter(self.rpm) if self.rpm > 0 else None
+        api_tasks = [self._identify(semaphore, limiter, data[0], data[1]) for data in segments_prompt_image]
         responses = await asyncio.gather(*api_tasks)
         return responses
     
@@ -169,10 +298,20 @@ class IdentifierAgent:
             )
 
         mission_id = analyzed_segments_batch[0]["processed_segment_info"]['mission_id']
-        
+
+        if not self.gemini_model:
+            # Sin Gemini no hay análisis contextual, así que tampoco se extraen los fotogramas
+            print(f"Agente Identificador: Gemini no está inicializado, no se pueden confirmar landmarks para la misión {mission_id}.")
+            return IdentifiedLandmarksBatchState(mission_id=mission_id, confirmed_landmarks=[], full_robot_path_poses=full_robot_path_poses)
+
         pending_landmarks_data = []
         prompts_for_api = []
 
+        sorted_poses = sorted(full_robot_path_poses, key=lambda pose: pose['timestamp_ms'])
+        pose_timestamps = [pose['timestamp_ms'] for pose in sorted_poses]
+        extraction_semaphore = asyncio.Semaphore(self.max_extraction_workers)
+        observations = []
+        frames_by_segment: Dict[str, Tuple[List[int], List[str]]] = {}
         landmark_counter = 0
         for analyzed_segment in analyzed_segments_batch:
             segment_info = analyzed_segment["processed_segment_info"]
@@ -182,50 +321,65 @@ class IdentifierAgent:
             if not analyzed_segment["identified_landmark_observations"]:
                 continue
 
+            timestamps, image_paths = frames_by_segment.setdefault(original_video_segment_path, ([], []))
             for obs in analyzed_segment["identified_landmark_observations"]:
                 landmark_counter += 1
                 landmark_id_str = f"LM_{mission_id}_{landmark_counter:03d}"
-                contextual_prompt = self._build_contextual_analysis_prompt(obs["landmark_name"])
-
                 best_image_filename = f"{mission_id}_{landmark_id_str}.jpg"
                 best_image_filepath = os.path.join(self.output_landmark_image_dir, best_image_filename)
 
-                extraction_success = self._extract_specific_frame(
-                    video_path=original_video_segment_path,
-                    timestamp_ms=obs['best_visibility_timestamp_in_segment_ms'],
-                    output_image_path=best_image_filepath
-                )
-                
-                if not extraction_success:
-                    print(f"Advertencia: No se pudo extraer la imagen para el landmark potencial en el timestamp {obs['best_visibility_timestamp_in_segment_ms']}ms. Omitiendo.")
-                    continue
-
-                image_path_for_report = best_image_filepath
-                landmark_timestamp_in_mission_ms = obs['best_visibility_timestamp_in_segment_ms'] # segment_start_time_in_mission_ms + obs['best_visibility_timestamp_in_segment_ms']
-                
-                estimated_lm_pose = self._find_closest_robot_pose(
-                    target_timestamp_ms=landmark_timestamp_in_mission_ms,
-                    all_poses=full_robot_path_poses
-                )
-
-                if self.gemini_model:
-                    try:
-                        with open(image_path_for_report, 'rb') as f:
-                            image_bytes = f.read()
-                            print(f"⏳ Identifier Agent: Preparing contextual analysis for '{landmark_id_str}'")
-                            
-                            prompts_for_api.append((contextual_prompt, image_bytes))
-                            
-                            pending_landmarks_data.append({
-                                "landmark_id": landmark_id_str,
-                                "image_path": image_path_for_report,
-                                "pose": estimated_lm_pose,
-                                "timestamp": landmark_timestamp_in_mission_ms
-                            })
-                    except FileNotFoundError:
-                        print(f"Error: No se encontró el archivo de imagen extraído en {image_path_for_report}. Omitiendo landmark.")
-                        continue
-        
+                timestamps.append(obs['best_visibility_timestamp_in_segment_ms'])
+                image_paths.append(best_image_filepath)
+                observations.append((landmark_id_str, obs, best_image_filepath))
+
+        # Un solo recorrido de cada segmento para todos sus landmarks, con los segmentos en paralelo
+        extracted_images: Dict[str, bytes] = {}
+        # Reparte los núcleos entre los hilos de extracción para que el pool de OpenCV no los
+        # sobresuscriba, y lo restaura después porque el ajuste es global al proceso
+        parallel_segments = min(len(frames_by_segment), self.max_extraction_workers)
+        previous_cv2_threads = cv2.getNumThreads()
+        cv2.setNumThreads(max(1, (os.cpu_count() or 1) // max(1, parallel_segments)))
+        try:
+            segment_results = await asyncio.gather(*(
+                self._extract_segment_frames(extraction_semaphore, video_path, timestamps, image_paths)
+                for video_path, (timestamps, image_paths) in frames_by_segment.items()
+            ))
+        finally:
+            cv2.setNumThreads(previous_cv2_threads)
+        for (timestamps, image_paths), results in zip(frames_by_segment.values(), segment_results):
+            extracted_images.update((image_path, image_bytes) for image_path, image_bytes in zip(image_paths, results) if image_bytes is not None)
+
+        # Los mensajes por landmark se imprimen juntos al final de cada bucle
+        messages = []
+        for landmark_id_str, obs, best_image_filepath in observations:
+            if best_image_filepath not in extracted_images:
+                messages.append(f"Advertencia: No se pudo extraer la imagen para el landmark potencial en el timestamp {obs['best_visibility_timestamp_in_segment_ms']}ms. Omitiendo.")
+                continue
+
+            contextual_prompt = self._build_contextual_analysis_prompt(obs["landmark_name"])
+
+            image_path_for_report = best_image_filepath
+            landmark_timestamp_in_mission_ms = obs['best_visibility_timestamp_in_segment_ms'] # segment_start_time_in_mission_ms + obs['best_visibility_timestamp_in_segment_ms']
+            
+            estimated_lm_pose = self._find_closest_robot_pose(
+                target_timestamp_ms=landmark_timestamp_in_mission_ms,
+                all_poses=sorted_poses,
+                pose_timestamps=pose_timestamps
+            )
+
+            # Los bytes vienen del extractor, sin volver a leer la imagen del disco
+            messages.append(f"⏳ Identifier Agent: Preparing contextual analysis for '{landmark_id_str}'")
+            prompts_for_api.append((contextual_prompt, extracted_images[image_path_for_report]))
+
+            pending_landmarks_data.append({
+                "landmark_id": landmark_id_str,
+                "image_path": image_path_for_report,
+                "pose": estimated_lm_pose,
+                "timestamp": landmark_timestamp_in_mission_ms
+            })
+        if messages:
+            print("\n".join(messages))
+
         if not pending_landmarks_data:
             print(f"Agente Identificador: No se encontraron landmarks válidos para procesar en la misión {mission_id}.")
             return IdentifiedLandmarksBatchState(mission_id=mission_id, confirmed_landmarks=[], full_robot_path_poses=full_robot_path_poses)
@@ -233,6 +387,7 @@ class IdentifierAgent:
         responses = await self.identify_responses(prompts_for_api)
 
         confirmed_landmarks_list: List[ConfirmedLandmarkState] = []
+        messages = []
         for response, landmark_data in zip(responses, pending_landmarks_data):
             obj_name, det_desc, ctx_analysis = self._parse_contextual_response(response.text)
 
@@ -247,8 +402,10 @@ class IdentifierAgent:
                 frames_observed_timestamps=[landmark_data["timestamp"]],
             )
             confirmed_landmarks_list.append(confirmed_lm)
-            print(f"✅ Agente Identificador: Landmark '{landmark_data['landmark_id']}' procesado. Nombre: '{obj_name}'.")
-                
+            messages.append(f"✅ Agente Identificador: Landmark '{landmark_data['landmark_id']}' procesado. Nombre: '{obj_name}'.")
+        if messages:
+            print("\n".join(messages))
+
         if not confirmed_landmarks_list:
             print(f"Agente Identificador: No se confirmaron landmarks para la misión {mission_id} después de procesar todos los segmentos.")
         else:
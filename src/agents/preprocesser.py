@@ -1,7 +1,6 @@
 # agents/preprocesser.py
 import os
 import subprocess
-import json
 import cv2
 from typing import List, Optional
 from states import MissionInputState, RobotPose
@@ -13,6 +12,12 @@ class PreprocessorAgent:
         if not os.path.exists(self.segment_output_dir):
             os.makedirs(self.segment_output_dir, exist_ok=True)
         self.SEGMENT_DURATION_SECONDS = 300 # 5 min
+        # Gemini samples the segments at 5 fps (VideoMetadata in utils/gemini_client.py); frames
+        # beyond that rate and resolutions above this width are only upload and billing overhead.
+        # Only the copy uploaded for analysis is reduced; the identifier extracts the landmark
+        # frames from the full-rate, full-resolution segment.
+        self.SEGMENT_FPS = 5
+        self.SEGMENT_MAX_WIDTH = 1280
 
     def _get_video_duration_seconds(self, video_path: str) -> Optional[float]:
         """Obtiene la duración total del video en segundos usando ffprobe."""
@@ -139,6 +144,7 @@ class PreprocessorAgent:
 
             segment_filename = f"{mission_id}_segment_{i+1:03d}_{os.path.basename(video_path_for_segmentation)}"
             output_segment_path = os.path.join(self.segment_output_dir, segment_filename)
+            analysis_segment_path = os.path.join(self.segment_output_dir, f"{mission_id}_segment_{i+1:03d}_analysis_{os.path.basename(video_path_for_segmentation)}")
 
             print(f"Processing {i+1}/{num_segments} segment: from {segment_start_seconds}s to {segment_start_seconds + current_segment_duration}s")
             print(f"Segment Output: {output_segment_path}")
@@ -148,6 +154,8 @@ class PreprocessorAgent:
             # pero el usuario especificó -c:v libx264 -preset ultrafast, lo que implica re-encodeo.
             # Si el formato original es compatible y solo se quiere cortar, -c copy sería ideal.
             # Por ahora, seguiré la especificación del usuario.
+            # Un solo decode produce las dos salidas: el segmento completo (para extraer fotogramas)
+            # y la copia reducida que se sube a Gemini. Las opciones preceden a la salida a la que aplican.
             cmd = [
                 "ffmpeg",
                 "-y",  # Sobrescribir archivo de salida si existe
@@ -157,7 +165,15 @@ class PreprocessorAgent:
                 "-c:v", "libx264", # Codec de video especificado
                 "-preset", "ultrafast", # Preset para velocidad de encodeo
                 "-an", # Opcional: remover audio si no es necesario para el análisis visual
-                output_segment_path
+                output_segment_path,
+                "-ss", str(segment_start_seconds),
+                "-t", str(current_segment_duration),
+                "-r", str(self.SEGMENT_FPS), # Solo los frames que Gemini va a muestrear
+                "-vf", f"scale='min({self.SEGMENT_MAX_WIDTH},iw)':-2", # Reduce sin ampliar, altura par
+                "-c:v", "libx264",
+                "-preset", "ultrafast",
+                "-an",
+                analysis_segment_path
             ]
 
             try:
@@ -178,6 +194,7 @@ class PreprocessorAgent:
                 video_segments_for_analysis.append(PreprocessedVideoSegmentState(
                     mission_id=mission_id,
                     video_segment_path=output_segment_path,
+                    analysis_video_path=analysis_segment_path,
                     start_time_in_original_video_ms=segment_start_ms,
                     end_time_in_original_video_ms=segment_end_ms,
                     robot_poses_for_segment=poses_for_this_segment
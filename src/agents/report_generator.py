@@ -1,16 +1,77 @@
+import functools
+import io
 import os
 from typing import List, Optional, Dict
 
+import cv2
+import numpy as np
 import markdown2
 from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
 
 from states import (
     IdentifiedLandmarksBatchState, ConfirmedLandmarkState, RobotPose
 )
 
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+# markdown2 compiles its extras' regexes when the converter is built; reuse one instance.
+_MARKDOWN = markdown2.Markdown(extras=['fenced-code-blocks', 'tables', 'cuddled-lists'])
+
+_CSS_STYLE = """
+    @page {
+        size: A4;
+        margin: 1in;
+    }
+    body {
+        font-family: 'Helvetica', sans-serif;
+        line-height: 1.6;
+        font-size: 11pt;
+    }
+    h1 {
+        text-align: center;
+        border-bottom: 3px solid #004a80;
+        padding-bottom: 15px;
+        color: #004a80;
+        font-size: 24pt;
+    }
+    h2 {
+        page-break-before: always; /* The key to section-per-page */
+        border-bottom: 1.5px solid #cccccc;
+        padding-top: 15px;
+        color: #004a80;
+        font-size: 18pt;
+    }
+    h3 {
+        color: #333333;
+        font-size: 14pt;
+        margin-top: 25px;
+    }
+    img {
+        max-width: 90%;
+        height: auto;
+        display: block;
+        margin-left: auto;
+        margin-right: auto;
+        border: 1px solid #ddd;
+        padding: 5px;
+        border-radius: 4px;
+    }
+    code {
+        background-color: #f0f0f0;
+        padding: 2px 5px;
+        border-radius: 4px;
+        font-family: 'Courier New', monospace;
+    }
+    ul {
+        list-style-type: disc;
+        padding-left: 20px;
+    }
+"""
+
+@functools.lru_cache(maxsize=1)
+def _report_stylesheet():
+    """Parses the report CSS once per process and shares its font configuration."""
+    font_config = FontConfiguration()
+    return CSS(string=_CSS_STYLE, font_config=font_config), font_config
 
 class ReportGeneratorAgent:
     def __init__(self, 
@@ -35,127 +96,107 @@ class ReportGeneratorAgent:
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.map_image_dir, exist_ok=True)
 
-    def _convert_md_to_pdf(self, markdown_filepath: str, pdf_filepath: str):
-        """Converts a given Markdown file to a PDF with sections on new pages."""
-        print(f"Starting PDF conversion for: {markdown_filepath}")
+    def _convert_md_to_pdf(self, md_content: str, pdf_filepath: str):
+        """Converts in-memory Markdown content to a PDF with sections on new pages."""
+        print(f"Starting PDF conversion for: {pdf_filepath}")
         
         try:
-            with open(markdown_filepath, 'r', encoding='utf-8') as f:
-                md_content = f.read()
-
-            css_style = """
-            @page {
-                size: A4;
-                margin: 1in;
-            }
-            body {
-                font-family: 'Helvetica', sans-serif;
-                line-height: 1.6;
-                font-size: 11pt;
-            }
-            h1 {
-                text-align: center;
-                border-bottom: 3px solid #004a80;
-                padding-bottom: 15px;
-                color: #004a80;
-                font-size: 24pt;
-            }
-            h2 {
-                page-break-before: always; /* The key to section-per-page */
-                border-bottom: 1.5px solid #cccccc;
-                padding-top: 15px;
-                color: #004a80;
-                font-size: 18pt;
-            }
-            h3 {
-                color: #333333;
-                font-size: 14pt;
-                margin-top: 25px;
-            }
-            img {
-                max-width: 90%;
-                height: auto;
-                display: block;
-                margin-left: auto;
-                margin-right: auto;
-                border: 1px solid #ddd;
-                padding: 5px;
-                border-radius: 4px;
-            }
-            code {
-                background-color: #f0f0f0;
-                padding: 2px 5px;
-                border-radius: 4px;
-                font-family: 'Courier New', monospace;
-            }
-            ul {
-                list-style-type: disc;
-                padding-left: 20px;
-            }
-            """
-            
-            html_body = markdown2.markdown(md_content, extras=['fenced-code-blocks', 'tables', 'cuddled-lists'])
+            html_body = _MARKDOWN.convert(md_content)
 
             # Combine into a full HTML document
-            full_html = f"<!DOCTYPE html><html><head><meta charset='UTF-8'><style>{css_style}</style></head><body>{html_body}</body></html>"
+            full_html = f"<!DOCTYPE html><html><head><meta charset='UTF-8'></head><body>{html_body}</body></html>"
 
-            base_url = os.path.dirname(markdown_filepath)
-            HTML(string=full_html, base_url=base_url).write_pdf(pdf_filepath)
+            # Image paths in the Markdown are relative to the reports directory.
+            base_url = self.output_dir
+            stylesheet, font_config = _report_stylesheet()
+            HTML(string=full_html, base_url=base_url).write_pdf(pdf_filepath, stylesheets=[stylesheet], font_config=font_config)
             
             print(f"✅ PDF report generated successfully: {pdf_filepath}")
 
         except Exception as e:
             print(f"❌ Error generating PDF: {e}")
 
+    def _render_map_cv2(self, path_x: List[float], path_y: List[float], landmarks: List[ConfirmedLandmarkState],
+                        mission_id: str, map_abs_path: str, max_side: int = 1200, margin: int = 60) -> bool:
+        """Draws the robot path and landmarks with OpenCV on a white canvas (equal axis scale) and saves it as PNG."""
+        lm_x = [lm['estimated_location']['x'] for lm in landmarks]
+        lm_y = [lm['estimated_location']['y'] for lm in landmarks]
+        xs = np.asarray(list(path_x) + lm_x, dtype=np.float64)
+        ys = np.asarray(list(path_y) + lm_y, dtype=np.float64)
+        if xs.size == 0:
+            xs, ys = np.zeros(1), np.zeros(1)
+
+        min_x, max_x = xs.min(), xs.max()
+        min_y, max_y = ys.min(), ys.max()
+        span = max(max_x - min_x, max_y - min_y, 1.0)
+        scale = (max_side - 2 * margin) / span  # pixels per meter
+        width = int((max_x - min_x) * scale) + 2 * margin
+        height = int((max_y - min_y) * scale) + 2 * margin
+
+        def to_px(x, y):
+            cols = np.rint((np.asarray(x, dtype=np.float64) - min_x) * scale).astype(np.int32) + margin
+            rows = height - 1 - margin - np.rint((np.asarray(y, dtype=np.float64) - min_y) * scale).astype(np.int32)
+            return cols, rows
+
+        img = np.full((height, width, 3), 255, np.uint8)
+
+        # 1 m grid
+        grid_color = (225, 225, 225)
+        for gx in np.arange(np.floor(min_x), np.ceil(max_x) + 1):
+            col = to_px(gx, min_y)[0]
+            cv2.line(img, (int(col), 0), (int(col), height - 1), grid_color, 1)
+        for gy in np.arange(np.floor(min_y), np.ceil(max_y) + 1):
+            row = to_px(min_x, gy)[1]
+            cv2.line(img, (0, int(row)), (width - 1, int(row)), grid_color, 1)
+
+        if len(path_x) > 1:
+            cols, rows = to_px(path_x, path_y)
+            pts = np.empty((len(cols), 1, 2), np.int32)
+            pts[:, 0, 0] = cols
+            pts[:, 0, 1] = rows
+            cv2.polylines(img, [pts], isClosed=False, color=(237, 149, 100), thickness=2, lineType=cv2.LINE_AA)
+
+        if landmarks:
+            cols, rows = to_px(lm_x, lm_y)
+            for lm, col, row in zip(landmarks, cols.tolist(), rows.tolist()):
+                cv2.drawMarker(img, (col, row), (0, 0, 255), cv2.MARKER_TILTED_CROSS, 16, 3, cv2.LINE_AA)
+                cv2.putText(img, str(lm['landmark_id']), (col - 20, max(12, row - 14)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 1, cv2.LINE_AA)
+
+        cv2.putText(img, f"Marsyard Map - Mission: {mission_id}", (margin, max(20, margin // 2)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2, cv2.LINE_AA)
+        return cv2.imwrite(map_abs_path, img, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+
     def _generate_map_image(self, robot_path: List[RobotPose], landmarks: List[ConfirmedLandmarkState], mission_id: str) -> Optional[str]:
         map_filename = f"map_{mission_id}.png"
         map_abs_path = os.path.join(self.map_image_dir, map_filename)
         map_relative_path = os.path.join("..", "map_images", map_filename)
 
-        plt.figure(figsize=(10, 8))
-        if robot_path:
-            path_x = [p['x'] for p in robot_path]
-            path_y = [p['y'] for p in robot_path]
-            plt.plot(path_x, path_y, marker='.', linestyle='-', label="Robot Path", markersize=3, linewidth=1, color='cornflowerblue')
-
-        if landmarks:
-            lm_x = [lm['estimated_location']['x'] for lm in landmarks]
-            lm_y = [lm['estimated_location']['y'] for lm in landmarks]
-            lm_ids = [lm['landmark_id'] for lm in landmarks]
-            plt.scatter(lm_x, lm_y, c='red', marker='X', s=120, label="Landmarks", edgecolors='black', linewidth=0.5)
-            for i, txt in enumerate(lm_ids):
-                plt.annotate(txt, (lm_x[i], lm_y[i]), textcoords="offset points", xytext=(0,10), ha='center', fontsize=9)
-
-        plt.title(f"Marsyard Map - Mission: {mission_id}", fontsize=16)
-        plt.xlabel("X Coordinate (m)", fontsize=12)
-        plt.ylabel("Y Coordinate (m)", fontsize=12)
-        plt.legend(fontsize=10)
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.axis('equal')
-        plt.tight_layout()
+        path_x = [p['x'] for p in robot_path] if robot_path else []
+        path_y = [p['y'] for p in robot_path] if robot_path else []
         try:
-            plt.savefig(map_abs_path)
-            plt.close()
+            if not self._render_map_cv2(path_x, path_y, landmarks or [], mission_id, map_abs_path):
+                raise IOError(f"cv2.imwrite failed for {map_abs_path}")
             return map_relative_path
         except Exception as e:
             print(f"Error generating or saving map: {e}")
-            plt.close()
             return None
 
     def _prepare_markdown_content(self, batch_state: IdentifiedLandmarksBatchState) -> str:
         """Prepares the full report content as a single Markdown string."""
-        markdown_lines: List[str] = []
+        buf = io.StringIO()
+        w = buf.write
         mission_id = batch_state['mission_id']
 
-        markdown_lines.append(f"# ERC 2025 Mission Report: {mission_id}")
+        w(f"# ERC 2025 Mission Report: {mission_id}\n")
         
-        markdown_lines.append("\n## General Findings\n")
-        markdown_lines.append(f"- **Total Landmarks Found:** {len(batch_state['confirmed_landmarks'])}")
+        w("\n## General Findings\n\n")
+        w(f"- **Total Landmarks Found:** {len(batch_state['confirmed_landmarks'])}\n")
         
         #llm_summary = "Mission summary by LLM (implementation with Gemini pending)."
-        #markdown_lines.append(f"- **Mission Summary (LLM):** {llm_summary}\n")
+        #w(f"- **Mission Summary (LLM):** {llm_summary}\n\n")
 
-        markdown_lines.append("\n### Mission Map\n")
+        w("\n### Mission Map\n\n")
         map_relative_path = self._generate_map_image(
             batch_state['full_robot_path_poses'],
             batch_state['confirmed_landmarks'],
@@ -163,38 +204,38 @@ class ReportGeneratorAgent:
         )
         if map_relative_path:
             map_display_path = map_relative_path.replace("\\", "/")
-            markdown_lines.append(f"![Mission Map]({map_display_path})\n")
+            w(f"![Mission Map]({map_display_path})\n\n")
         else:
-            markdown_lines.append("*Could not generate map image.*\n")
+            w("*Could not generate map image.*\n\n")
 
         if not batch_state['confirmed_landmarks']:
-            markdown_lines.append("\n**No landmarks confirmed in this mission.**\n")
+            w("\n**No landmarks confirmed in this mission.**\n\n")
         
         for lm in batch_state['confirmed_landmarks']:
-            markdown_lines.append(f"\n## Landmark Detail: {lm['landmark_id']}\n")
+            w(f"\n## Landmark Detail: {lm['landmark_id']}\n\n")
             
             if lm['best_image_path'] and os.path.exists(lm['best_image_path']):
                 landmark_image_filename = os.path.basename(lm['best_image_path'])
                 landmark_image_display_path = os.path.join("..", "landmark_images", landmark_image_filename).replace("\\", "/")
-                markdown_lines.append(f"![Photo of Landmark {lm['landmark_id']}]({landmark_image_display_path})\n")
+                w(f"![Photo of Landmark {lm['landmark_id']}]({landmark_image_display_path})\n\n")
             else:
-                markdown_lines.append(f"*Photo of landmark {lm['landmark_id']} not available or path not found.*\n")
+                w(f"*Photo of landmark {lm['landmark_id']} not available or path not found.*\n\n")
 
-            markdown_lines.append(f"- **Name/Category:** {lm['object_name_or_category']}")
-            markdown_lines.append("- **Detailed Visual Description:**")
+            w(f"- **Name/Category:** {lm['object_name_or_category']}\n")
+            w("- **Detailed Visual Description:**\n")
             for line in lm['detailed_visual_description'].split('\n'):
-                if line.strip(): markdown_lines.append(f"  > {line}") # Using blockquote for better formatting
+                if line.strip(): w(f"  > {line}\n") # Using blockquote for better formatting
             
-            markdown_lines.append("- **Martian Contextual Analysis:**")
+            w("- **Martian Contextual Analysis:**\n")
             for line in lm['contextual_analysis'].split('\n'):
-                if line.strip(): markdown_lines.append(f"  > {line}")
+                if line.strip(): w(f"  > {line}\n")
 
-            markdown_lines.append("- **Estimated Location (Robot Pose):**")
-            markdown_lines.append(f"  - Timestamp: {lm['estimated_location']['timestamp_ms']} ms")
-            markdown_lines.append(f"  - X: {lm['estimated_location']['x']:.2f} m, Y: {lm['estimated_location']['y']:.2f} m")
-            markdown_lines.append(f"  - Orientation: {lm['estimated_location']['orientation_degrees']:.1f}°")
+            w("- **Estimated Location (Robot Pose):**\n")
+            w(f"  - Timestamp: {lm['estimated_location']['timestamp_ms']} ms\n")
+            w(f"  - X: {lm['estimated_location']['x']:.2f} m, Y: {lm['estimated_location']['y']:.2f} m\n")
+            w(f"  - Orientation: {lm['estimated_location']['orientation_degrees']:.1f}°\n")
 
-        return "\n".join(markdown_lines)
+        return buf.getvalue()
 
     def generate_markdown_report(self, markdown_content: str, mission_id: str) -> str:
         """Saves the Markdown content to a .md file and returns the path."""
@@ -227,9 +268,9 @@ class ReportGeneratorAgent:
         md_report_path = self.generate_markdown_report(markdown_full_content, mission_id)
         
         pdf_report_path = None
-        if self.generate_pdf and md_report_path:
-            pdf_report_path = md_report_path.replace(".md", ".pdf")
-            self._convert_md_to_pdf(md_report_path, pdf_report_path)
+        if self.generate_pdf:
+            pdf_report_path = os.path.join(self.output_dir, f"ERC2025_Report_{mission_id}.pdf")
+            self._convert_md_to_pdf(markdown_full_content, pdf_report_path)
         
         print(f"Report Generator Agent: Finished mission {mission_id}.")
         return {"markdown": md_report_path, "pdf": pdf_report_path}
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import TypedDict, List, Optional
+from typing import TypedDict, List
 from .preprocessed_video_segment_state import PreprocessedVideoSegmentState 
 
 class LandmarkObservation(TypedDict):
@@ -1,4 +1,4 @@
-from typing import TypedDict, List, Any, Optional
+from typing import TypedDict, List
 from .mission_input_state import RobotPose
 
 class ConfirmedLandmarkState(TypedDict):
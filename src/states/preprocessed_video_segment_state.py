@@ -1,4 +1,4 @@
-from typing import TypedDict, List, Optional
+from typing import TypedDict, List
 from .mission_input_state import RobotPose
 
 class PreprocessedVideoSegmentState(TypedDict):
@@ -8,6 +8,7 @@ class PreprocessedVideoSegmentState(TypedDict):
     """
     mission_id: str
     video_segment_path: str # Path al archivo de video (o segmento)
+    analysis_video_path: str # Copia reducida (fps y resolución) que se sube a Gemini
     start_time_in_original_video_ms: int # Para rastrear si es un segmento
     end_time_in_original_video_ms: int   # Para rastrear si es un segmento
     robot_poses_for_segment: List[RobotPose] # Poses relevantes para este segmento
\ No newline at end of file
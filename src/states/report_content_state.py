@@ -1,4 +1,4 @@
-from typing import TypedDict, List, Any, Optional
+from typing import TypedDict, List, Optional
 
 class GeneralFindingsContent(TypedDict):
     """
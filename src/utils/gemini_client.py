@@ -1,8 +1,9 @@
-import google.genai as genai, types
 import os
-from typing import List, Dict, Any 
+from typing import Any, Dict, List, Optional, Tuple
 import time
-import pathlib
+import asyncio
+import functools
+from datetime import datetime, timedelta, timezone
 import google.genai as genai
 from google.genai import types
 
@@ -18,7 +19,11 @@ try:
         raise ValueError("La variable de entorno GOOGLE_API_KEY no está configurada.")
     
     # Use genai.Client as shown in the provided documentation context
-    gemini_client_instance = genai.Client(api_key=GOOGLE_API_KEY)
+    # Retries 408/429/5xx with exponential backoff and jitter (SDK defaults: 5 attempts, up to 60 s apart)
+    gemini_client_instance = genai.Client(
+        api_key=GOOGLE_API_KEY,
+        http_options=types.HttpOptions(retry_options=types.HttpRetryOptions()),
+    )
     print("INFO: Cliente de Gemini inicializado correctamente.")
 
 except ValueError as e:
@@ -49,6 +54,8 @@ class ModelExecutionWrapper:
             self.model_to_call = f"models/{model_name_str}"
         else:
             self.model_to_call = model_name_str
+        # Videos already uploaded through the Files API, keyed by (path, mtime_ns, size)
+        self._uploaded_videos: Dict[Tuple[str, int, int], types.File] = {}
         print(f"INFO: ModelExecutionWrapper inicializado para el modelo: {self.model_to_call}")
 
     def generate_content(self, contents: Any) -> types.GenerateContentResponse:
@@ -81,6 +88,102 @@ class ModelExecutionWrapper:
         )
         return response 
     
+    async def upload_video(self, video_path: str, poll_interval: float = 2.0) -> types.File:
+        """
+        Uploads a video through the Files API and waits until Gemini has processed it.
+        An unchanged file that was already uploaded reuses its resource until it expires.
+        """
+        st = os.stat(video_path)
+        key = (os.path.abspath(video_path), st.st_mtime_ns, st.st_size)
+        video_file = self._uploaded_videos.get(key)
+        # keep a margin so a resource does not expire between this check and the request
+        if video_file is not None and (video_file.expiration_time is None or
+                                       video_file.expiration_time > datetime.now(timezone.utc) + timedelta(minutes=10)):
+            return video_file
+
+        video_file = await self.client.aio.files.upload(file=video_path)
+        while video_file.state == types.FileState.PROCESSING:
+            await asyncio.sleep(poll_interval)
+            video_file = await self.client.aio.files.get(name=video_file.name)
+        if video_file.state != types.FileState.ACTIVE:
+            raise RuntimeError(f"El video '{video_path}' no quedó activo en Gemini (estado: {video_file.state}).")
+
+        self._uploaded_videos[key] = video_file
+        return video_file
+
+    @staticmethod
+    def _video_file_contents(prompt: Any, video_file: types.File) -> List[types.Part]:
+        return [
+            types.Part(
+                file_data = types.FileData(
+                    file_uri = video_file.uri,
+                    mime_type = video_file.mime_type or 'video/mp4'
+                    ),
+                video_metadata = types.VideoMetadata(fps=5)
+                ),
+            types.Part(text = prompt)
+        ]
+
+    async def generate_content_from_video_file(self, prompt: Any, video_file: types.File) -> types.GenerateContentResponse:
+        """
+        Same request as generate_content_from_video, but references a video uploaded with
+        upload_video instead of sending its bytes inline.
+        """
+        response = await self.client.aio.models.generate_content(
+            model = "gemini-2.5-flash",
+            contents = self._video_file_contents(prompt, video_file),
+            config = types.GenerateContentConfig(
+                temperature = 0.2  
+                )
+        )
+        return response 
+
+    async def generate_content_from_video_files_batch(self, requests: List[Tuple[Any, types.File]],
+                                                      poll_interval: float = 30.0,
+                                                      max_wait: float = 24 * 3600.0) -> List[Optional[types.GenerateContentResponse]]:
+        """
+        Sends every (prompt, video_file) request as a single Batch API job and waits for it.
+        Batch jobs are billed at a discount but can take far longer than direct requests.
+        Returns the responses in the same order as the requests; a request that failed inside a
+        partially successful job is returned as None. A job still unfinished after max_wait
+        seconds is cancelled and raises TimeoutError.
+        """
+        job = await self.client.aio.batches.create(
+            model = self.model_to_call,
+            src = [
+                types.InlinedRequest(
+                    contents = self._video_file_contents(prompt, video_file),
+                    config = types.GenerateContentConfig(temperature = 0.2)
+                )
+                for prompt, video_file in requests
+            ]
+        )
+        print(f"INFO: Batch de Gemini creado: {job.name} ({len(requests)} peticiones)")
+        done_states = {types.JobState.JOB_STATE_SUCCEEDED, types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED,
+                       types.JobState.JOB_STATE_FAILED, types.JobState.JOB_STATE_CANCELLED,
+                       types.JobState.JOB_STATE_EXPIRED}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_wait
+        while job.state not in done_states:
+            if loop.time() >= deadline:
+                try:
+                    await self.client.aio.batches.cancel(name=job.name)
+                except Exception as e:
+                    print(f"WARNING: No se pudo cancelar el batch de Gemini {job.name}: {e}")
+                raise TimeoutError(f"El batch de Gemini {job.name} sigue en estado {job.state} tras {max_wait:.0f} s.")
+            await asyncio.sleep(min(poll_interval, max(0.0, deadline - loop.time())))
+            job = await self.client.aio.batches.get(name=job.name)
+
+        if job.state not in (types.JobState.JOB_STATE_SUCCEEDED, types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED):
+            raise RuntimeError(f"El batch de Gemini {job.name} terminó en estado {job.state}: {job.error}")
+        inlined = job.dest.inlined_responses if job.dest else None
+        if not inlined or len(inlined) != len(requests):
+            raise RuntimeError(f"El batch de Gemini {job.name} no devolvió una respuesta por petición.")
+        failed = [i for i, item in enumerate(inlined) if item.response is None]
+        if failed:
+            print(f"WARNING: El batch de Gemini {job.name} falló en las peticiones {failed}: {inlined[failed[0]].error}")
+        return [item.response for item in inlined]
+
     async def generate_content_from_image(self, prompt: str, image_bytes: bytes) -> types.GenerateContentResponse:
         response = await self.client.aio.models.generate_content(
             model = "gemini-2.5-flash",
@@ -99,9 +202,11 @@ class ModelExecutionWrapper:
         )
         return response 
 
+@functools.lru_cache(maxsize=1)
 def get_gemini_model() -> ModelExecutionWrapper | None:
     """
     Retorna una instancia del wrapper que permite llamadas tipo model.generate_content().
+    La instancia se comparte entre agentes, junto con su caché de videos subidos.
     Adheres to "No cambies el nombre de la funciones, ni sus argumentos".
     The return type hint genai.GenerativeModel is not strictly true anymore,
     but the returned object will have the required .generate_content method.
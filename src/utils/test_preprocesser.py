@@ -2,7 +2,6 @@ import os
 import subprocess
 import cv2
 import numpy as np
-import json
 from typing import TypedDict, List, Optional
 
 # ==============================================================================
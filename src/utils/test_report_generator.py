@@ -1,10 +1,9 @@
 import os
-import random
 from typing import List, Optional, Dict, TypedDict
 
 # --- Library Imports ---
 import markdown2
-from weasyprint import HTML, CSS
+from weasyprint import HTML
 import matplotlib
 matplotlib.use('Agg')  # To prevent GUI issues on servers
 import matplotlib.pyplot as plt